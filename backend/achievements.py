@@ -0,0 +1,121 @@
+"""
+Achievement rules and awarding.
+
+Each rule compares one metric (a column listed in ``METRIC_COLUMNS``)
+against a threshold. Rules in the same group are tiers of one badge; only the
+highest earned tier is shown. Earned achievements are persisted in
+``user_achievements`` whenever a commit changes a user's counters, so reading
+them is a single indexed lookup and adding a rule over an existing metric
+adds no queries.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import event
+
+from models import db, User, UserAchievement, UserCounters, UserStreak
+from activity import changed_users, insert_missing
+
+AchievementRule = namedtuple(
+    'AchievementRule', ('key', 'group', 'metric', 'threshold', 'title', 'description', 'icon')
+)
+
+# Ordered for display; higher tiers come first within a group
+ACHIEVEMENT_RULES = (
+    AchievementRule('point_master', 'points', 'points', 1000, 'Point Master', 'Earned 1000+ points', '🏆'),
+    AchievementRule('point_collector', 'points', 'points', 500, 'Point Collector', 'Earned 500+ points', '🥉'),
+    AchievementRule('note_taking_pro', 'notes', 'total_notes', 50, 'Note Taking Pro', 'Created 50+ notes', '📚'),
+    AchievementRule('note_taker', 'notes', 'total_notes', 10, 'Note Taker', 'Created 10+ notes', '📝'),
+    AchievementRule('quiz_master', 'quizzes', 'total_quiz_attempts', 100, 'Quiz Master', 'Completed 100+ quizzes', '🧠'),
+    AchievementRule('quiz_enthusiast', 'quizzes', 'total_quiz_attempts', 25, 'Quiz Enthusiast', 'Completed 25+ quizzes', '🎯'),
+    AchievementRule('perfectionist', 'perfect_scores', 'perfect_scores', 5, 'Perfectionist', 'Achieved 5+ perfect quiz scores', '⭐'),
+    AchievementRule('weekly_warrior', 'streak', 'longest_streak', 7, 'Weekly Warrior', 'Active for 7 days straight', '🔥'),
+)
+
+RULES_BY_KEY = {rule.key: rule for rule in ACHIEVEMENT_RULES}
+
+# Where each rule metric is stored; names match the dashboard counters
+METRIC_COLUMNS = {
+    'points': User.points,
+    'total_notes': UserCounters.notes_count,
+    'total_quiz_attempts': UserCounters.quiz_attempts,
+    'perfect_scores': UserCounters.perfect_scores,
+    'longest_streak': UserStreak.longest_streak,
+}
+
+def load_metrics(user_id):
+    """Values of the metrics the rules use, or None if the user does not exist.
+
+    Reads only those columns by primary/unique key, which keeps evaluation on
+    every write far cheaper than the full dashboard counters statement.
+    """
+    metrics = sorted({rule.metric for rule in ACHIEVEMENT_RULES})
+    row = db.session.query(*(METRIC_COLUMNS[metric].label(metric) for metric in metrics))\
+        .select_from(User)\
+        .outerjoin(UserCounters, UserCounters.user_id == User.id)\
+        .outerjoin(UserStreak, UserStreak.user_id == User.id)\
+        .filter(User.id == user_id)\
+        .first()
+    return row._asdict() if row else None
+
+def evaluate_rules(counters):
+    """Rules satisfied by a dict of metric values (or the full dashboard counters)."""
+    return [rule for rule in ACHIEVEMENT_RULES if (counters.get(rule.metric) or 0) >= rule.threshold]
+
+def _earned_keys(user_id):
+    return {key for (key,) in db.session.query(UserAchievement.achievement_key).filter_by(user_id=user_id)}
+
+def award_achievements(user_id, counters=None):
+    """Persist any newly earned achievements for a user and return their rules.
+
+    Rows are inserted with ON CONFLICT DO NOTHING, so a concurrent commit
+    that awards the same badge first cannot fail this transaction. Does not
+    commit; the caller (or the commit hook) owns the transaction.
+    """
+    if counters is None:
+        counters = load_metrics(user_id)
+        if counters is None:
+            return []
+    
+    satisfied = evaluate_rules(counters)
+    if not satisfied:
+        return []
+    earned = _earned_keys(user_id)
+    return [
+        rule for rule in satisfied
+        if rule.key not in earned
+        and insert_missing(UserAchievement, ['user_id', 'achievement_key'], user_id=user_id, achievement_key=rule.key)
+    ]
+
+def get_user_achievements(user_id):
+    """Earned achievements for display: the highest earned tier of each group."""
+    earned = {
+        row.achievement_key: row
+        for row in UserAchievement.query.filter_by(user_id=user_id).all()
+        if row.achievement_key in RULES_BY_KEY
+    }
+    
+    achievements = []
+    shown_groups = set()
+    for rule in ACHIEVEMENT_RULES:
+        if rule.key not in earned or rule.group in shown_groups:
+            continue
+        shown_groups.add(rule.group)
+        achievements.append({
+            'key': rule.key,
+            'title': rule.title,
+            'description': rule.description,
+            'icon': rule.icon,
+            'earned': True,
+            'earned_at': earned[rule.key].earned_at.isoformat()
+        })
+    return achievements
+
+def _award_on_commit(session):
+    for user_id in sorted(changed_users(session)):
+        award_achievements(user_id)
+
+def init_achievements(app):
+    """Award achievements as part of every commit that changes a user's counters."""
+    if not event.contains(db.session, 'before_commit', _award_on_commit):
+        event.listen(db.session, 'before_commit', _award_on_commit)
@@ -0,0 +1,367 @@
+"""
+Write-side bookkeeping for user activity.
+
+Routes call these helpers whenever an action changes a user's score so the
+derived leaderboard row is updated incrementally in the same transaction as
+the originating write. None of the helpers commit; the calling route owns
+the transaction.
+
+Every helper records the user it touched; commit listeners (rank index,
+caches, achievements) read that set through ``changed_users``. Users whose
+leaderboard row was written are also listed in ``leaderboard_changed_users``,
+which is all the ranking listeners need.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import (
+    db, User, Leaderboard, SubjectLeaderboard, PointsBucket, PointsEvent, UserDailyActivity, UserStreak,
+    UserCounters
+)
+from score_distribution import GLOBAL_SCOPE, note_average_moved
+
+# Points awarded per action
+POINTS_NOTE_CREATED = 10
+POINTS_QUIZ_GENERATED = 20
+POINTS_QUIZ_FROM_NOTE = 15
+POINTS_PER_CORRECT_ANSWER = 5
+POINTS_PAST_QUESTION_UPLOADED = 25
+
+def mark_user_changed(user_id):
+    """Record that the user's leaderboard row or counters changed in this transaction."""
+    db.session.info.setdefault('changed_user_ids', set()).add(user_id)
+
+def mark_leaderboard_changed(user_id):
+    """Record that the user's leaderboard row changed in this transaction."""
+    mark_user_changed(user_id)
+    db.session.info.setdefault('leaderboard_changed_user_ids', set()).add(user_id)
+
+def changed_users(session):
+    """Users marked changed in ``session``'s current transaction.
+
+    Meant for ``before_commit`` listeners. The set is only cleared once the
+    transaction has ended, so listeners may run in any order.
+    """
+    return frozenset(session.info.get('changed_user_ids', ()))
+
+def leaderboard_changed_users(session):
+    """Users whose leaderboard row changed in ``session``'s current transaction."""
+    return frozenset(session.info.get('leaderboard_changed_user_ids', ()))
+
+def _clear_changed_users(session, *args):
+    session.info.pop('changed_user_ids', None)
+    session.info.pop('leaderboard_changed_user_ids', None)
+
+def init_activity(app):
+    """Reset the changed-users set at the end of every transaction."""
+    if not event.contains(db.session, 'after_commit', _clear_changed_users):
+        event.listen(db.session, 'after_commit', _clear_changed_users)
+        event.listen(db.session, 'after_soft_rollback', _clear_changed_users)
+
+_DIALECT_INSERTS = {'mysql': mysql.insert, 'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+def _dialect_insert(model):
+    """INSERT construct for ``model`` that supports the dialect's upsert clauses."""
+    return _DIALECT_INSERTS[_dialect_name()](model.__table__)
+
+def insert_missing(model, conflict_columns, **values):
+    """Insert a row unless one with the same ``conflict_columns`` already exists.
+
+    Uses ON CONFLICT DO NOTHING (INSERT IGNORE on MySQL), so two transactions
+    creating the same row concurrently cannot fail on the unique constraint.
+    Callers follow up with an atomic UPDATE of the row. Returns the number
+    of rows inserted.
+    """
+    statement = _dialect_insert(model).values(**values)
+    if _dialect_name() == 'mysql':
+        statement = statement.prefix_with('IGNORE')
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+    return db.session.execute(statement).rowcount
+
+def ensure_leaderboard_entry(user_id):
+    """Create the leaderboard row for a user if it does not exist yet."""
+    if insert_missing(
+        Leaderboard, ['user_id'],
+        user_id=user_id,
+        total_points=0,
+        quizzes_completed=0,
+        notes_uploaded=0,
+        average_score=0.0
+    ):
+        mark_leaderboard_changed(user_id)
+
+def _update_leaderboard(user_id, *assignments):
+    """Apply column assignments to a user's leaderboard row atomically."""
+    ensure_leaderboard_entry(user_id)
+    db.session.execute(
+        db.update(Leaderboard)
+        .where(Leaderboard.user_id == user_id)
+        .ordered_values(*assignments, (Leaderboard.updated_at, datetime.utcnow()))
+        .execution_options(synchronize_session='fetch')
+    )
+    mark_leaderboard_changed(user_id)
+
+def _update_subject_leaderboard(user_id, subject, points, percentage):
+    """Fold one attempt into the user's per-subject aggregate row."""
+    insert_missing(
+        SubjectLeaderboard, ['subject', 'user_id'],
+        subject=subject,
+        user_id=user_id,
+        attempts=0,
+        average_score=0.0,
+        total_points=0
+    )
+    db.session.execute(
+        db.update(SubjectLeaderboard)
+        .where(SubjectLeaderboard.subject == subject, SubjectLeaderboard.user_id == user_id)
+        .ordered_values(
+            (SubjectLeaderboard.average_score,
+             (SubjectLeaderboard.average_score * SubjectLeaderboard.attempts + percentage)
+             / (SubjectLeaderboard.attempts + 1)),
+            (SubjectLeaderboard.attempts, SubjectLeaderboard.attempts + 1),
+            (SubjectLeaderboard.total_points, SubjectLeaderboard.total_points + points),
+            (SubjectLeaderboard.updated_at, datetime.utcnow())
+        )
+        .execution_options(synchronize_session='fetch')
+    )
+
+def _add_to_points_bucket(user_id, points):
+    """Add points to today's bucket in the points ledger with a single upsert."""
+    statement = _dialect_insert(PointsBucket).values(
+        user_id=user_id,
+        granularity='day',
+        bucket_date=datetime.utcnow().date(),
+        points=points
+    )
+    if _dialect_name() == 'mysql':
+        statement = statement.on_duplicate_key_update(points=PointsBucket.points + statement.inserted.points)
+    else:
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'granularity', 'bucket_date'],
+            set_={'points': PointsBucket.points + statement.excluded.points}
+        )
+    db.session.execute(statement)
+
+def _bump_user_counters(user_id, **deltas):
+    """Add ``deltas`` to the user's ``user_counters`` row, flooring at zero.
+
+    The user is marked changed so that cached counters are evicted once
+    the transaction commits (see ``counters.init_counters_cache``).
+    """
+    insert_missing(
+        UserCounters, ['user_id'],
+        user_id=user_id,
+        notes_count=0,
+        quizzes_created=0,
+        quiz_attempts=0,
+        perfect_scores=0,
+        score_total=0.0,
+        past_questions_uploaded=0
+    )
+    values = {}
+    for name, delta in deltas.items():
+        column = getattr(UserCounters, name)
+        values[name] = db.case((column + delta > 0, column + delta), else_=0)
+    db.session.execute(
+        db.update(UserCounters)
+        .where(UserCounters.user_id == user_id)
+        .values(updated_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session='fetch')
+    )
+    mark_user_changed(user_id)
+
+def _extend_streak(user_id, day):
+    """Count ``day`` as an active day in the user's streak with one atomic update.
+
+    Days at or before ``last_active_day`` are no-ops, so repeated activity on
+    the same day costs a single non-matching UPDATE.
+    """
+    insert_missing(UserStreak, ['user_id'], user_id=user_id, current_streak=0, longest_streak=0)
+    continued = db.case(
+        (UserStreak.last_active_day == day - timedelta(days=1), UserStreak.current_streak + 1),
+        else_=1
+    )
+    # longest_streak is assigned first so that every expression reads the
+    # pre-update values (MySQL evaluates SET left to right).
+    db.session.execute(
+        db.update(UserStreak)
+        .where(
+            UserStreak.user_id == user_id,
+            db.or_(UserStreak.last_active_day.is_(None), UserStreak.last_active_day < day)
+        )
+        .ordered_values(
+            (UserStreak.longest_streak,
+             db.case((continued > UserStreak.longest_streak, continued), else_=UserStreak.longest_streak)),
+            (UserStreak.current_streak, continued),
+            (UserStreak.last_active_day, day)
+        )
+        .execution_options(synchronize_session='fetch')
+    )
+
+def _bump_daily_activity(user_id, day=None, **deltas):
+    """Add ``deltas`` to the user's activity rollup row for ``day`` (default today).
+
+    Counters never go below zero, so late decrements for days whose row was
+    never backfilled are harmless. Any positive delta marks the day active
+    for the user's streak.
+    """
+    day = day or datetime.utcnow().date()
+    insert_missing(
+        UserDailyActivity, ['user_id', 'day'],
+        user_id=user_id,
+        day=day,
+        notes_created=0,
+        quizzes_taken=0,
+        quizzes_created=0,
+        points=0
+    )
+    values = {}
+    for name, delta in deltas.items():
+        column = getattr(UserDailyActivity, name)
+        values[name] = db.case((column + delta > 0, column + delta), else_=0)
+    db.session.execute(
+        db.update(UserDailyActivity)
+        .where(UserDailyActivity.user_id == user_id, UserDailyActivity.day == day)
+        .values(**values)
+        .execution_options(synchronize_session='fetch')
+    )
+    
+    if any(delta > 0 for delta in deltas.values()):
+        _extend_streak(user_id, day)
+
+def _award_points(user_id, points, reason, leaderboard=(), **activity_deltas):
+    """Record a points event and apply it to every points projection.
+
+    ``leaderboard`` assignments and ``activity_deltas`` for the action that
+    earned the points are folded into the same leaderboard UPDATE and daily
+    activity upsert, so each action touches those rows once.
+
+    ``User.points`` and the leaderboard total are only ever changed with
+    atomic ``SET points = points + :n`` updates, so concurrent awards for the
+    same user cannot overwrite each other.
+    """
+    leaderboard = list(leaderboard)
+    if points:
+        db.session.add(PointsEvent(user_id=user_id, points=points, reason=reason))
+        db.session.execute(
+            db.update(User)
+            .where(User.id == user_id)
+            .values(points=User.points + points)
+            .execution_options(synchronize_session='fetch')
+        )
+        leaderboard.append((Leaderboard.total_points, Leaderboard.total_points + points))
+        _add_to_points_bucket(user_id, points)
+        activity_deltas['points'] = points
+    if leaderboard:
+        _update_leaderboard(user_id, *leaderboard)
+    if activity_deltas:
+        _bump_daily_activity(user_id, **activity_deltas)
+
+def record_user_registered(user_id):
+    """Give a new user a leaderboard row so they show up in rankings."""
+    ensure_leaderboard_entry(user_id)
+
+def record_note_created(user_id):
+    """Account for a newly created note."""
+    _bump_user_counters(user_id, notes_count=1)
+    _award_points(
+        user_id, POINTS_NOTE_CREATED, 'note_created',
+        leaderboard=[(Leaderboard.notes_uploaded, Leaderboard.notes_uploaded + 1)],
+        notes_created=1
+    )
+    return POINTS_NOTE_CREATED
+
+def record_note_deleted(user_id, created_at=None):
+    """Account for a deleted note. Points already awarded are kept."""
+    _update_leaderboard(
+        user_id,
+        (Leaderboard.notes_uploaded,
+         db.case((Leaderboard.notes_uploaded > 0, Leaderboard.notes_uploaded - 1), else_=0))
+    )
+    if created_at:
+        _bump_daily_activity(user_id, day=created_at.date(), notes_created=-1)
+    _bump_user_counters(user_id, notes_count=-1)
+
+def record_quiz_generated(user_id, from_note=False):
+    """Account for a quiz generated from pasted content or from a note."""
+    _bump_user_counters(user_id, quizzes_created=1)
+    points = POINTS_QUIZ_FROM_NOTE if from_note else POINTS_QUIZ_GENERATED
+    _award_points(
+        user_id, points, 'quiz_from_note' if from_note else 'quiz_generated',
+        quizzes_created=1
+    )
+    return points
+
+def record_quiz_attempt(user_id, score, total_questions, subject=None):
+    """Account for a submitted quiz attempt and return the points earned.
+
+    When the quiz's ``subject`` is given, the per-subject leaderboard row is
+    updated as well. The user's averages are moved in the score
+    distributions once the transaction commits.
+    """
+    percentage = (score * 100.0 / total_questions) if total_questions else 0.0
+
+    _bump_user_counters(
+        user_id,
+        quiz_attempts=1,
+        perfect_scores=1 if total_questions and score == total_questions else 0,
+        score_total=percentage
+    )
+
+    # The running average must be computed from the pre-update count, so it
+    # is assigned before quizzes_completed (MySQL evaluates SET left to right).
+    points = score * POINTS_PER_CORRECT_ANSWER
+    _award_points(
+        user_id, points, 'quiz_attempt',
+        leaderboard=[
+            (Leaderboard.average_score,
+             (Leaderboard.average_score * Leaderboard.quizzes_completed + percentage)
+             / (Leaderboard.quizzes_completed + 1)),
+            (Leaderboard.quizzes_completed, Leaderboard.quizzes_completed + 1)
+        ],
+        quizzes_taken=1
+    )
+    
+    if subject:
+        _update_subject_leaderboard(user_id, subject, points, percentage)
+    _note_average_moves(user_id, subject, percentage)
+    return points
+
+def _previous_average(total, count, percentage):
+    """Average before the latest ``percentage`` was added, or None if it was the first."""
+    return (total - percentage) / (count - 1) if count > 1 else None
+
+def _note_average_moves(user_id, subject, percentage):
+    """Queue the moves of the user's overall and subject averages in the score distributions.
+
+    Reads the rows just updated (and locked) by this transaction, so the
+    previous averages are derived from them without racing other attempts.
+    """
+    attempts, score_total = db.session.query(UserCounters.quiz_attempts, UserCounters.score_total)\
+        .filter(UserCounters.user_id == user_id).one()
+    note_average_moved(
+        GLOBAL_SCOPE, _previous_average(score_total, attempts, percentage), score_total / attempts
+    )
+    if subject:
+        attempts, average_score = db.session.query(SubjectLeaderboard.attempts, SubjectLeaderboard.average_score)\
+            .filter(SubjectLeaderboard.subject == subject, SubjectLeaderboard.user_id == user_id).one()
+        note_average_moved(
+            subject, _previous_average(average_score * attempts, attempts, percentage), average_score
+        )
+
+def record_past_question_uploaded(user_id):
+    """Account for an uploaded past question."""
+    _bump_user_counters(user_id, past_questions_uploaded=1)
+    _award_points(user_id, POINTS_PAST_QUESTION_UPLOADED, 'past_question_uploaded')
+    return POINTS_PAST_QUESTION_UPLOADED
+
+def record_past_question_deleted(user_id):
+    """Account for a deleted past question. Points already awarded are kept."""
+    _bump_user_counters(user_id, past_questions_uploaded=-1)
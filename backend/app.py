@@ -5,6 +5,16 @@ from flask_cors import CORS
 import os
 from config import config
 from security import init_security
+from activity import init_activity
+from rank_index import init_rank_index
+from leaderboard_cache import init_leaderboard_cache
+from leaderboard_scheduler import leaderboard_scheduler, init_leaderboard_scheduler
+from achievements import init_achievements
+from counters import init_counters_cache
+from score_distribution import score_distributions, init_score_distributions
+from model_registry import model_registry, init_model_registry, warm_up_models
+from quiz_jobs import quiz_job_workers, init_quiz_jobs
+from question_cache import question_cache, init_question_cache
 
 # Initialize extensions
 migrate = Migrate()
@@ -34,6 +44,26 @@ def create_app(config_name=None):
     # Initialize security features
     limiter = init_security(app)
     
+    # Keep the in-process leaderboard rank index and caches in sync with commits
+    init_activity(app)
+    init_rank_index(app)
+    init_leaderboard_scheduler(app)
+    init_counters_cache(app)
+    init_score_distributions(app)
+    
+    # Persist newly earned achievements when a commit changes a user's counters
+    init_achievements(app)
+    
+    # Bumps the shared leaderboard version; kept after the listeners above that write
+    init_leaderboard_cache(app)
+    
+    # ML models load lazily (see start_background_workers for warm-up)
+    init_model_registry(app)
+    init_question_cache(app)
+    
+    # Queued quiz generation; workers start in start_background_workers
+    init_quiz_jobs(app)
+    
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -70,7 +100,9 @@ def create_app(config_name=None):
         return jsonify({
             'status': 'healthy', 
             'message': 'EduAccess API is running',
-            'environment': config_name
+            'environment': config_name,
+            'models': model_registry.status(),
+            'question_cache': question_cache.stats()
         })
     
     # Error handlers
@@ -82,4 +114,19 @@ def create_app(config_name=None):
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
     
-    return app
\ No newline at end of file
+    return app
+
+def start_background_workers(app):
+    """Start the background threads of a serving process.
+
+    Only the server entrypoint (run.py) calls this. Scripts that build the app
+    with create_app (jobs.py, init_db.py, seed_data.py, check_config.py) get
+    the commit hooks but no threads.
+    """
+    if app.config.get('LEADERBOARD_SCHEDULER_ENABLED', True):
+        leaderboard_scheduler.start(app)
+    if app.config.get('SCORE_DISTRIBUTION_SYNC_ENABLED', True):
+        score_distributions.start(app)
+    if quiz_job_workers.pool_size > 0:
+        quiz_job_workers.start(app)
+    warm_up_models(app)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PyTorch and ONNX Runtime question generation backends.
+
+Each backend runs in its own subprocess so that resident memory is measured
+separately. For every sentence of a fixed corpus it reports single-input
+latency (p50/p95), batched throughput and RSS after loading and after the
+run, then compares the generated questions. Greedy decoding on the int8
+model should reproduce nearly every question; ``--min-match`` turns the
+comparison into a pass/fail check.
+
+Requires transformers, torch and optimum[onnxruntime], and an export made
+with export_onnx_model.py.
+
+Usage:
+    python benchmark_onnx_backend.py
+    python benchmark_onnx_backend.py --onnx-path onnx_models/t5-small-qg-hl-int8 --repeat 5
+    python benchmark_onnx_backend.py --min-match 0.9     # exit 1 if fewer questions match
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from benchmark_question_generation import SAMPLE_TEXT
+
+def corpus_inputs():
+    sentences = [s.strip() for s in re.split(r'[.!?]+', SAMPLE_TEXT) if len(s.strip()) > 20]
+    return [f"generate question: {sentence}" for sentence in sentences]
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux), else peak RSS."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_backend(backend, onnx_path, repeat, batch_size):
+    """Load one backend, time it on the corpus and return the measurements."""
+    from model_registry import model_registry, use_onnx_question_generation
+
+    baseline = rss_mb()
+    if backend == 'onnx':
+        use_onnx_question_generation(onnx_path)
+    start = time.perf_counter()
+    generator = model_registry.get('question_generation')
+    if generator is None:
+        return {'backend': backend, 'error': model_registry.status()['question_generation'].get('error')}
+    load_seconds = time.perf_counter() - start
+    loaded = rss_mb()
+
+    inputs = corpus_inputs()
+    generator(inputs[0], max_length=64)  # warm-up
+
+    latencies = []
+    questions = []
+    for _ in range(repeat):
+        questions = []
+        for text in inputs:
+            started = time.perf_counter()
+            result = generator(text, max_length=64, num_return_sequences=1)
+            latencies.append(time.perf_counter() - started)
+            questions.append(result[0]['generated_text'].strip())
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        generator(inputs, max_length=64, num_return_sequences=1, batch_size=batch_size)
+    batched_seconds = (time.perf_counter() - started) / repeat
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        'throughput': len(inputs) / batched_seconds,
+        'rss_baseline_mb': baseline,
+        'rss_loaded_mb': loaded,
+        'rss_final_mb': rss_mb(),
+        'questions': questions
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PyTorch vs ONNX Runtime question generation')
+    parser.add_argument('--onnx-path', default=Config.QUESTION_GENERATION_ONNX_PATH)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--min-match', type=float, default=None,
+                        help='fail unless at least this fraction of questions match PyTorch')
+    parser.add_argument('--run-backend', choices=['pytorch', 'onnx'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: measure one backend and report as JSON
+    if args.run_backend:
+        print(json.dumps(run_backend(args.run_backend, args.onnx_path, args.repeat, args.batch_size)))
+        return
+
+    results = {}
+    for backend in ('pytorch', 'onnx'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-backend', backend,
+             '--onnx-path', args.onnx_path, '--repeat', str(args.repeat), '--batch-size', str(args.batch_size)],
+            capture_output=True, text=True
+        )
+        lines = output.stdout.strip().splitlines()
+        if output.returncode != 0 or not lines:
+            print(f"{backend} run failed:\n{output.stderr}")
+            sys.exit(1)
+        results[backend] = json.loads(lines[-1])
+        if 'error' in results[backend]:
+            print(f"{backend} model unavailable: {results[backend]['error']}")
+            sys.exit(1)
+
+    print(f"{'':<28} {'pytorch':>12} {'onnx int8':>12}")
+    rows = (
+        ('load time (s)', 'load_seconds', '.2f'),
+        ('latency p50 (ms)', 'p50_ms', '.1f'),
+        ('latency p95 (ms)', 'p95_ms', '.1f'),
+        ('batched questions/s', 'throughput', '.2f'),
+        ('RSS after load (MB)', 'rss_loaded_mb', '.0f'),
+        ('RSS after run (MB)', 'rss_final_mb', '.0f'),
+    )
+    for label, key, fmt in rows:
+        print(f"{label:<28} {results['pytorch'][key]:>12{fmt}} {results['onnx'][key]:>12{fmt}}")
+
+    pairs = list(zip(results['pytorch']['questions'], results['onnx']['questions']))
+    matches = sum(1 for reference, candidate in pairs if reference == candidate)
+    match_rate = matches / len(pairs) if pairs else 0.0
+    print(f"\n{'identical questions':<28} {matches}/{len(pairs)} ({match_rate:.0%})")
+    for reference, candidate in pairs:
+        if reference != candidate:
+            print(f"  pytorch: {reference}\n  onnx:    {candidate}")
+
+    if args.min_match is not None and match_rate < args.min_match:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
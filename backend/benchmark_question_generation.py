@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for quiz question generation.
+
+Loads the question-generation pipeline once, then compares the original
+one-call-per-sentence loop against batched generation for 5 and 10
+questions, reporting questions per second. The generated question texts
+are compared as well; greedy decoding should give the same questions,
+though padding can occasionally change a token.
+
+Requires transformers and torch (see requirements.txt) and downloads the
+model on first run.
+
+Usage:
+    python benchmark_question_generation.py
+    python benchmark_question_generation.py --repeat 5 --batch-size 4
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_registry import model_registry
+from routes.quiz import generate_questions_from_text
+
+SAMPLE_TEXT = (
+    "Photosynthesis is the process by which green plants convert light energy into chemical energy. "
+    "Chlorophyll in the chloroplasts absorbs mostly blue and red light from the sun. "
+    "The light-dependent reactions take place in the thylakoid membranes and produce oxygen. "
+    "The Calvin cycle uses carbon dioxide and ATP to build glucose in the stroma. "
+    "Cellular respiration releases the energy stored in glucose inside the mitochondria. "
+    "Glycolysis splits one glucose molecule into two molecules of pyruvate in the cytoplasm. "
+    "The Krebs cycle completes the breakdown of pyruvate and releases carbon dioxide. "
+    "The electron transport chain produces most of the ATP made during respiration. "
+    "Fermentation allows cells to produce a small amount of ATP without oxygen. "
+    "Yeast cells ferment sugar into ethanol and carbon dioxide during bread making. "
+    "Enzymes are proteins that speed up chemical reactions by lowering activation energy. "
+    "Temperature and pH both affect how quickly an enzyme can catalyse its reaction."
+)
+
+def legacy_generate(question_generator, text, num_questions):
+    """The original implementation: one pipeline call per sentence."""
+    sentences = re.split(r'[.!?]+', text)
+    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
+
+    questions = []
+    for sentence in sentences[:num_questions]:
+        result = question_generator(f"generate question: {sentence}", max_length=64, num_return_sequences=1)
+        if result:
+            questions.append(result[0]['generated_text'].strip())
+            if len(questions) >= num_questions:
+                break
+    return questions
+
+def timed(label, fn, repeat, num_questions):
+    fn()  # warm-up, excluded from timing
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<45} {elapsed:>10.3f}s {num_questions / elapsed:>10.2f} questions/s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched question generation')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per measurement')
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    question_generator = model_registry.get('question_generation')
+    if question_generator is None:
+        print(f"Question generation model unavailable: {model_registry.status()['question_generation']}")
+        sys.exit(1)
+    print(f"Loaded model in {time.perf_counter() - start:.1f}s\n")
+
+    for num_questions in (5, 10):
+        legacy = timed(
+            f'per-sentence loop ({num_questions} questions)',
+            lambda: legacy_generate(question_generator, SAMPLE_TEXT, num_questions),
+            args.repeat, num_questions
+        )
+        batched = timed(
+            f'batched, batch size {args.batch_size} ({num_questions} questions)',
+            lambda: generate_questions_from_text(
+                SAMPLE_TEXT, num_questions, batch_size=args.batch_size, use_cache=False
+            ),
+            args.repeat, num_questions
+        )
+        same = legacy == [question['question'] for question in batched]
+        print(f"{'same questions':<45} {str(same):>10}\n")
+
+if __name__ == '__main__':
+    main()
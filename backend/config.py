@@ -55,6 +55,54 @@ class Config:
     POSTS_PER_PAGE = 10
     USERS_PER_PAGE = 20
     
+    # Leaderboard rank index (seconds before resyncing with the database)
+    RANK_INDEX_MAX_AGE = int(os.environ.get('RANK_INDEX_MAX_AGE', 300))
+    
+    # Daily points buckets older than this are compacted into weekly buckets
+    POINTS_BUCKET_RETENTION_DAYS = int(os.environ.get('POINTS_BUCKET_RETENTION_DAYS', 35))
+    
+    # Leaderboard page cache (seconds between cross-process version checks)
+    LEADERBOARD_CACHE_MAX_ENTRIES = int(os.environ.get('LEADERBOARD_CACHE_MAX_ENTRIES', 256))
+    LEADERBOARD_CACHE_CHECK_INTERVAL = int(os.environ.get('LEADERBOARD_CACHE_CHECK_INTERVAL', 30))
+    
+    # Background leaderboard recompute (seconds between batches, users per batch)
+    LEADERBOARD_SCHEDULER_ENABLED = os.environ.get('LEADERBOARD_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    LEADERBOARD_RECOMPUTE_INTERVAL = int(os.environ.get('LEADERBOARD_RECOMPUTE_INTERVAL', 10))
+    LEADERBOARD_RECOMPUTE_BATCH_SIZE = int(os.environ.get('LEADERBOARD_RECOMPUTE_BATCH_SIZE', 500))
+    
+    # In-process cache of per-user dashboard counters (seconds to live; 0 disables)
+    USER_COUNTERS_CACHE_MAX_ENTRIES = int(os.environ.get('USER_COUNTERS_CACHE_MAX_ENTRIES', 1024))
+    USER_COUNTERS_CACHE_TTL = int(os.environ.get('USER_COUNTERS_CACHE_TTL', 60))
+    
+    # Models to load in a background thread at startup: comma-separated names, 'all', or empty for lazy loading
+    MODEL_WARMUP = os.environ.get('MODEL_WARMUP', '')
+    
+    # Question generation backend: 'pytorch', or 'onnx' to serve the int8 export made by
+    # export_onnx_model.py from QUESTION_GENERATION_ONNX_PATH (requires optimum[onnxruntime])
+    QUESTION_GENERATION_BACKEND = os.environ.get('QUESTION_GENERATION_BACKEND', 'pytorch').lower()
+    QUESTION_GENERATION_ONNX_PATH = os.environ.get(
+        'QUESTION_GENERATION_ONNX_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_models', 't5-small-qg-hl-int8')
+    )
+    
+    # Sentences per padded batch when generating quiz questions
+    QUESTION_GENERATION_BATCH_SIZE = int(os.environ.get('QUESTION_GENERATION_BATCH_SIZE', 8))
+    
+    # Generated question cache: database rows kept (least recently used evicted) and in-process entries
+    QUESTION_CACHE_ENABLED = os.environ.get('QUESTION_CACHE_ENABLED', 'true').lower() == 'true'
+    QUESTION_CACHE_MAX_ENTRIES = int(os.environ.get('QUESTION_CACHE_MAX_ENTRIES', 5000))
+    QUESTION_CACHE_MEMORY_ENTRIES = int(os.environ.get('QUESTION_CACHE_MEMORY_ENTRIES', 128))
+    
+    # Quiz generation job workers per process (0 disables), seconds between queue polls, and
+    # seconds after which a running job is assumed abandoned and reclaimed
+    QUIZ_JOB_WORKERS = int(os.environ.get('QUIZ_JOB_WORKERS', 2))
+    QUIZ_JOB_POLL_INTERVAL = int(os.environ.get('QUIZ_JOB_POLL_INTERVAL', 2))
+    QUIZ_JOB_TIMEOUT = int(os.environ.get('QUIZ_JOB_TIMEOUT', 300))
+    
+    # Quiz score distributions for percentile ranks (seconds between database syncs)
+    SCORE_DISTRIBUTION_SYNC_ENABLED = os.environ.get('SCORE_DISTRIBUTION_SYNC_ENABLED', 'true').lower() == 'true'
+    SCORE_DISTRIBUTION_SYNC_INTERVAL = int(os.environ.get('SCORE_DISTRIBUTION_SYNC_INTERVAL', 60))
+    
     @staticmethod
     def init_app(app):
         pass
@@ -85,6 +133,9 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    LEADERBOARD_SCHEDULER_ENABLED = False
+    SCORE_DISTRIBUTION_SYNC_ENABLED = False
+    QUIZ_JOB_WORKERS = 0
 
 config = {
     'development': DevelopmentConfig,
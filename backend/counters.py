@@ -0,0 +1,143 @@
+"""
+Per-user dashboard counters.
+
+Totals are read from the ``user_counters`` row, which ``activity`` keeps
+current by write-through; rank, weekly activity and streaks come from their
+own derived tables. Everything is fetched in one statement, and the result
+is held in a small in-process LRU for ``USER_COUNTERS_CACHE_TTL`` seconds.
+Entries are evicted as soon as a commit in this process changes the user's
+counters or score; writes from other processes are picked up when the
+entry expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+
+from models import db, User, Leaderboard, UserDailyActivity, UserStreak, UserCounters
+from routes.leaderboard import rank_column
+from activity import changed_users
+
+class CountersCache:
+    """LRU of counters dicts keyed by user id, with a time-to-live."""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(cached[1])
+
+    def set(self, user_id, counters):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), dict(counters))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+counters_cache = CountersCache()
+
+def _recent_activity(column, days):
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return db.select(func.coalesce(func.sum(column), 0)).where(
+        UserDailyActivity.user_id == User.id,
+        UserDailyActivity.day >= since
+    ).correlate(User).scalar_subquery()
+
+def counters_query(user_id):
+    """The counters statement for one user; ``rank`` is NULL without a leaderboard row."""
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+
+    return db.session.query(
+        User.id,
+        User.username,
+        User.first_name,
+        User.last_name,
+        User.points,
+        db.case((Leaderboard.id.is_(None), None), else_=rank_column()).label('rank'),
+        db.select(func.count(User.id)).scalar_subquery().label('total_users'),
+        func.coalesce(UserCounters.notes_count, 0).label('total_notes'),
+        func.coalesce(UserCounters.quizzes_created, 0).label('total_quizzes_created'),
+        func.coalesce(UserCounters.quiz_attempts, 0).label('total_quiz_attempts'),
+        func.coalesce(UserCounters.past_questions_uploaded, 0).label('total_past_questions_uploaded'),
+        _recent_activity(UserDailyActivity.notes_created, 7).label('notes_this_week'),
+        _recent_activity(UserDailyActivity.quizzes_taken, 7).label('quiz_attempts_this_week'),
+        db.case(
+            (UserCounters.quiz_attempts > 0, UserCounters.score_total / UserCounters.quiz_attempts), else_=None
+        ).label('average_quiz_score'),
+        func.coalesce(UserCounters.perfect_scores, 0).label('perfect_scores'),
+        db.case(
+            (UserStreak.last_active_day >= yesterday, UserStreak.current_streak), else_=0
+        ).label('current_streak'),
+        func.coalesce(UserStreak.longest_streak, 0).label('longest_streak')
+    ).outerjoin(Leaderboard, Leaderboard.user_id == User.id)\
+     .outerjoin(UserCounters, UserCounters.user_id == User.id)\
+     .outerjoin(UserStreak, UserStreak.user_id == User.id)\
+     .filter(User.id == user_id)
+
+def load_counters(user_id):
+    """Counters for a user read from the database, or None if the user does not exist."""
+    row = counters_query(user_id).first()
+    if row is None:
+        return None
+    counters = row._asdict()
+    average = counters['average_quiz_score']
+    counters['average_quiz_score'] = round(average, 2) if average else 0.0
+    counters['notes_this_week'] = int(counters['notes_this_week'])
+    counters['quiz_attempts_this_week'] = int(counters['quiz_attempts_this_week'])
+    return counters
+
+def get_counters(user_id):
+    """All dashboard counters for a user as a dict, or None if the user does not exist."""
+    counters = counters_cache.get(user_id)
+    if counters is None:
+        counters = load_counters(user_id)
+        if counters is not None:
+            counters_cache.set(user_id, counters)
+    return counters
+
+def _capture_changed_users(session):
+    changed = changed_users(session)
+    if changed:
+        session.info.setdefault('user_counters_evict', set()).update(changed)
+
+def _evict_changed_users(session):
+    changed = session.info.pop('user_counters_evict', None)
+    if changed:
+        counters_cache.evict(changed)
+
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop('user_counters_evict', None)
+
+def init_counters_cache(app):
+    """Configure the counters cache and evict entries when their user's counters change."""
+    counters_cache.max_entries = app.config.get('USER_COUNTERS_CACHE_MAX_ENTRIES', 1024)
+    counters_cache.ttl = app.config.get('USER_COUNTERS_CACHE_TTL', 60)
+    if not event.contains(db.session, 'before_commit', _capture_changed_users):
+        event.listen(db.session, 'before_commit', _capture_changed_users)
+        event.listen(db.session, 'after_commit', _evict_changed_users)
+        event.listen(db.session, 'after_soft_rollback', _discard_changed_users)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Export the question generation model to ONNX with dynamic int8 quantization.
+
+Exports ``valhalla/t5-small-qg-hl`` to ONNX (encoder and decoders) with
+optimum, quantizes every graph with dynamic int8 quantization and writes the
+result, together with the config and tokenizer, to the directory served
+when ``QUESTION_GENERATION_BACKEND=onnx`` (``QUESTION_GENERATION_ONNX_PATH``).
+
+Requires ``optimum[onnxruntime]`` in addition to requirements.txt.
+
+Usage:
+    python export_onnx_model.py
+    python export_onnx_model.py --output onnx_models/t5-small-qg-hl-int8 --arch avx2
+    python export_onnx_model.py --no-quantize      # fp32 export only
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from model_registry import QUESTION_GENERATION_MODEL
+
+def quantization_config(arch):
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    builders = {
+        'avx2': AutoQuantizationConfig.avx2,
+        'avx512': AutoQuantizationConfig.avx512,
+        'avx512_vnni': AutoQuantizationConfig.avx512_vnni,
+        'arm64': AutoQuantizationConfig.arm64,
+    }
+    return builders[arch](is_static=False, per_channel=False)
+
+def export(model_id, output, quantize=True, arch='avx512_vnni'):
+    """Export ``model_id`` to ``output``. Returns the ONNX files written."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from transformers import AutoTokenizer
+
+    os.makedirs(output, exist_ok=True)
+    export_dir = tempfile.mkdtemp(prefix='onnx-export-') if quantize else output
+    try:
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_id, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(output)
+        if not quantize:
+            return sorted(name for name in os.listdir(output) if name.endswith('.onnx'))
+
+        # Copy the config files, then replace each graph with its quantized version
+        for name in os.listdir(export_dir):
+            if not name.endswith('.onnx') and os.path.isfile(os.path.join(export_dir, name)):
+                shutil.copy(os.path.join(export_dir, name), output)
+        config = quantization_config(arch)
+        written = []
+        for name in sorted(os.listdir(export_dir)):
+            if not name.endswith('.onnx'):
+                continue
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=name)
+            quantizer.quantize(save_dir=output, quantization_config=config, file_suffix='')
+            written.append(name)
+        return written
+    finally:
+        if quantize:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the question generation model to ONNX (int8)')
+    parser.add_argument('--model', default=QUESTION_GENERATION_MODEL)
+    parser.add_argument('--output', default=Config.QUESTION_GENERATION_ONNX_PATH)
+    parser.add_argument('--arch', default='avx512_vnni', choices=['avx2', 'avx512', 'avx512_vnni', 'arm64'],
+                        help='instruction set the int8 kernels are tuned for')
+    parser.add_argument('--no-quantize', action='store_true', help='write the fp32 export only')
+    args = parser.parse_args()
+
+    try:
+        written = export(args.model, args.output, quantize=not args.no_quantize, arch=args.arch)
+    except ImportError as e:
+        print(f"ONNX export needs optimum[onnxruntime]: {e}")
+        sys.exit(1)
+
+    kind = 'fp32' if args.no_quantize else f'int8 ({args.arch})'
+    print(f"Wrote {kind} ONNX model to {args.output}: {', '.join(written)}")
+    print("Serve it with QUESTION_GENERATION_BACKEND=onnx"
+          + ('' if args.output == Config.QUESTION_GENERATION_ONNX_PATH
+             else f" QUESTION_GENERATION_ONNX_PATH={args.output}"))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Maintenance jobs for derived tables.
+
+Usage:
+    python jobs.py compact-points-buckets                  # uses POINTS_BUCKET_RETENTION_DAYS
+    python jobs.py compact-points-buckets --retention-days 60
+    python jobs.py reconcile-points                        # report drift only
+    python jobs.py reconcile-points --fix
+    python jobs.py backfill-daily-activity
+    python jobs.py backfill-streaks                        # after backfill-daily-activity
+    python jobs.py rebuild-user-counters
+    python jobs.py rebuild-score-distributions
+    python jobs.py award-achievements                      # after adding achievement rules
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import (
+    db, User, Note, Quiz, QuizAttempt, PastQuestion, PointsBucket, PointsEvent, UserDailyActivity, UserStreak,
+    UserCounters, SubjectLeaderboard, ScoreDistributionBin
+)
+from score_distribution import GLOBAL_SCOPE, ScoreHistogram
+from achievements import award_achievements
+
+def compact_points_buckets(retention_days):
+    """Fold daily points buckets older than the retention period into weekly buckets.
+
+    Each week is keyed by its Monday. A week straddling the cutoff is folded
+    in pieces across runs; the weekly bucket accumulates each piece.
+    Returns the number of daily buckets removed.
+    """
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+
+    old_dates = db.session.query(PointsBucket.bucket_date)\
+        .filter(PointsBucket.granularity == 'day', PointsBucket.bucket_date < cutoff)\
+        .distinct().all()
+    week_starts = sorted({day - timedelta(days=day.weekday()) for (day,) in old_dates})
+
+    if db.engine.dialect.name == 'mysql':
+        upsert = 'ON DUPLICATE KEY UPDATE points = points + VALUES(points)'
+    else:
+        upsert = ('ON CONFLICT (user_id, granularity, bucket_date) '
+                  'DO UPDATE SET points = points_buckets.points + excluded.points')
+
+    removed = 0
+    for week_start in week_starts:
+        params = {
+            'week_start': week_start,
+            'week_end': min(week_start + timedelta(days=7), cutoff)
+        }
+        db.session.execute(db.text(f"""
+            INSERT INTO points_buckets (user_id, granularity, bucket_date, points)
+            SELECT user_id, 'week', :week_start, SUM(points)
+            FROM points_buckets
+            WHERE granularity = 'day' AND bucket_date >= :week_start AND bucket_date < :week_end
+            GROUP BY user_id
+            {upsert}
+        """), params)
+        result = db.session.execute(db.text("""
+            DELETE FROM points_buckets
+            WHERE granularity = 'day' AND bucket_date >= :week_start AND bucket_date < :week_end
+        """), params)
+        removed += result.rowcount
+        # One transaction per week keeps lock times short on large ledgers
+        db.session.commit()
+
+    return removed
+
+def find_points_drift():
+    """Users whose ``points`` differ from the sum of their points events.
+
+    Returns a list of ``(user_id, points, ledger_points)`` tuples.
+    """
+    ledger = db.session.query(
+        PointsEvent.user_id,
+        db.func.sum(PointsEvent.points).label('ledger_points')
+    ).group_by(PointsEvent.user_id).subquery()
+
+    ledger_points = db.func.coalesce(ledger.c.ledger_points, 0)
+    rows = db.session.query(User.id, db.func.coalesce(User.points, 0), ledger_points)\
+        .outerjoin(ledger, ledger.c.user_id == User.id)\
+        .filter(db.func.coalesce(User.points, 0) != ledger_points)\
+        .all()
+    return [(user_id, points, int(ledger_total)) for user_id, points, ledger_total in rows]
+
+def reconcile_points(fix=False):
+    """Verify ``User.points`` against the points ledger.
+
+    With ``fix``, an ``adjustment`` event is appended for every mismatch so the
+    ledger sums to the current balance. Mismatches normally come from points
+    granted before the ledger existed (seed data, older releases), which the
+    adjustment records as an opening balance.
+    """
+    drift = find_points_drift()
+    if fix and drift:
+        db.session.add_all([
+            PointsEvent(user_id=user_id, points=points - ledger_points, reason='adjustment')
+            for user_id, points, ledger_points in drift
+        ])
+        db.session.commit()
+    return drift
+
+def backfill_daily_activity(chunk_size=5000):
+    """Rebuild ``user_daily_activity`` from the source tables.
+
+    Counts come from one grouped query per table and points from the points
+    ledger (adjustment events excluded, since they are not activity). The
+    table is replaced in a single transaction, so run it while writes are
+    quiet. Returns the number of rollup rows written.
+    """
+    sources = (
+        ('notes_created', Note.user_id, Note.created_at, db.func.count(), None),
+        ('quizzes_taken', QuizAttempt.user_id, QuizAttempt.completed_at, db.func.count(), None),
+        ('quizzes_created', Quiz.created_by, Quiz.created_at, db.func.count(), None),
+        ('points', PointsEvent.user_id, PointsEvent.created_at, db.func.sum(PointsEvent.points),
+         PointsEvent.reason != 'adjustment'),
+    )
+    empty = {'notes_created': 0, 'quizzes_taken': 0, 'quizzes_created': 0, 'points': 0}
+
+    rollup = {}
+    for name, owner, timestamp, value, condition in sources:
+        day = db.func.date(timestamp)
+        query = db.session.query(owner, day, value)
+        if condition is not None:
+            query = query.filter(condition)
+        for user_id, day_value, total in query.group_by(owner, day):
+            if isinstance(day_value, str):
+                day_value = date.fromisoformat(day_value)
+            rollup.setdefault((user_id, day_value), dict(empty))[name] = int(total or 0)
+
+    rows = [dict(counts, user_id=user_id, day=day) for (user_id, day), counts in rollup.items()]
+    db.session.execute(UserDailyActivity.__table__.delete())
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(UserDailyActivity.__table__.insert(), rows[start:start + chunk_size])
+    db.session.commit()
+    return len(rows)
+
+def backfill_streaks(chunk_size=5000):
+    """Rebuild ``user_streaks`` from the daily activity rollup.
+
+    Active days are read once, sorted by user and day, and each user's
+    current and longest streak is folded in a single pass. The table is
+    replaced in a single transaction. Returns the number of users written.
+    """
+    active = db.or_(
+        UserDailyActivity.notes_created > 0,
+        UserDailyActivity.quizzes_taken > 0,
+        UserDailyActivity.quizzes_created > 0,
+        UserDailyActivity.points > 0
+    )
+    days = db.session.query(UserDailyActivity.user_id, UserDailyActivity.day)\
+        .filter(active)\
+        .order_by(UserDailyActivity.user_id, UserDailyActivity.day)
+
+    streaks = {}
+    for user_id, day in days:
+        streak = streaks.get(user_id)
+        if streak is None:
+            streak = streaks[user_id] = {
+                'user_id': user_id, 'current_streak': 0, 'longest_streak': 0, 'last_active_day': None
+            }
+        if streak['last_active_day'] == day - timedelta(days=1):
+            streak['current_streak'] += 1
+        else:
+            streak['current_streak'] = 1
+        streak['longest_streak'] = max(streak['longest_streak'], streak['current_streak'])
+        streak['last_active_day'] = day
+
+    rows = list(streaks.values())
+    db.session.execute(UserStreak.__table__.delete())
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(UserStreak.__table__.insert(), rows[start:start + chunk_size])
+    db.session.commit()
+    return len(rows)
+
+def rebuild_user_counters(chunk_size=5000):
+    """Rebuild ``user_counters`` from the source tables.
+
+    Each total comes from one grouped query per table. Every user gets a row,
+    and the table is replaced in a single transaction, so run it while
+    writes are quiet. Cached counters in running servers expire within
+    ``USER_COUNTERS_CACHE_TTL``. Returns the number of rows written.
+    """
+    percentage = QuizAttempt.score * 100.0 / QuizAttempt.total_questions
+    sources = (
+        ('notes_count', Note.user_id, db.func.count(), None),
+        ('quizzes_created', Quiz.created_by, db.func.count(), None),
+        ('quiz_attempts', QuizAttempt.user_id, db.func.count(), None),
+        ('perfect_scores', QuizAttempt.user_id, db.func.count(),
+         QuizAttempt.score == QuizAttempt.total_questions),
+        ('score_total', QuizAttempt.user_id, db.func.sum(percentage), None),
+        ('past_questions_uploaded', PastQuestion.uploaded_by, db.func.count(), None),
+    )
+    empty = {
+        'notes_count': 0, 'quizzes_created': 0, 'quiz_attempts': 0,
+        'perfect_scores': 0, 'score_total': 0.0, 'past_questions_uploaded': 0
+    }
+
+    totals = {user_id: dict(empty) for (user_id,) in db.session.query(User.id)}
+    for name, owner, value, condition in sources:
+        query = db.session.query(owner, value)
+        if condition is not None:
+            query = query.filter(condition)
+        for user_id, total in query.group_by(owner):
+            if user_id in totals:
+                totals[user_id][name] = total or 0
+
+    now = datetime.utcnow()
+    rows = [dict(counts, user_id=user_id, updated_at=now) for user_id, counts in totals.items()]
+    db.session.execute(UserCounters.__table__.delete())
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(UserCounters.__table__.insert(), rows[start:start + chunk_size])
+    db.session.commit()
+    return len(rows)
+
+def rebuild_score_distributions():
+    """Rebuild ``score_distribution_bins`` from the users' current averages.
+
+    Overall averages come from ``user_counters`` and subject averages from
+    ``subject_leaderboard``, the same rows the dashboard compares against, so
+    run ``rebuild-user-counters`` first if those were rebuilt. Averages are
+    binned in Python so the rounding matches live updates. Running servers
+    pick the new totals up on their next sync; deltas they have not flushed
+    yet are added on top. Returns the number of bins written.
+    """
+    histograms = {GLOBAL_SCOPE: ScoreHistogram()}
+    for attempts, score_total in db.session.query(UserCounters.quiz_attempts, UserCounters.score_total)\
+            .filter(UserCounters.quiz_attempts > 0):
+        histograms[GLOBAL_SCOPE].add(score_total / attempts)
+    for subject, average_score in db.session.query(SubjectLeaderboard.subject, SubjectLeaderboard.average_score)\
+            .filter(SubjectLeaderboard.attempts > 0):
+        histograms.setdefault(subject, ScoreHistogram()).add(average_score)
+
+    rows = [
+        {'scope': scope, 'bin': bin_, 'count': count}
+        for scope, histogram in histograms.items()
+        for bin_, count in enumerate(histogram.counts) if count
+    ]
+    db.session.execute(ScoreDistributionBin.__table__.delete())
+    if rows:
+        db.session.execute(ScoreDistributionBin.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+def award_all_achievements(chunk_size=500):
+    """Evaluate achievement rules for every user, e.g. after a rule is added.
+
+    Commits every ``chunk_size`` users. Returns the number of achievements awarded.
+    """
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+    awarded = 0
+    for start in range(0, len(user_ids), chunk_size):
+        for user_id in user_ids[start:start + chunk_size]:
+            awarded += len(award_achievements(user_id))
+        db.session.commit()
+    return awarded
+
+def main():
+    parser = argparse.ArgumentParser(description='EduAccess maintenance jobs')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    subparsers = parser.add_subparsers(dest='job', required=True)
+
+    compact = subparsers.add_parser('compact-points-buckets', help='fold old daily points buckets into weeks')
+    compact.add_argument('--retention-days', type=int, default=None)
+
+    reconcile = subparsers.add_parser('reconcile-points', help='verify user points against the points ledger')
+    reconcile.add_argument('--fix', action='store_true', help='append adjustment events for mismatches')
+
+    subparsers.add_parser('backfill-daily-activity', help='rebuild the per-user daily activity rollup')
+    subparsers.add_parser('backfill-streaks', help='rebuild current and longest streaks from the rollup')
+    subparsers.add_parser('rebuild-user-counters', help='rebuild per-user counters from the source tables')
+    subparsers.add_parser('rebuild-score-distributions', help='rebuild quiz score distributions from user averages')
+    subparsers.add_parser('award-achievements', help='award achievements earned under the current rules')
+
+    args = parser.parse_args()
+
+    app = create_app(config_name=args.config)
+    with app.app_context():
+        if args.job == 'compact-points-buckets':
+            retention_days = args.retention_days
+            if retention_days is None:
+                retention_days = app.config['POINTS_BUCKET_RETENTION_DAYS']
+            removed = compact_points_buckets(retention_days)
+            print(f"Compacted {removed} daily points buckets older than {retention_days} days")
+        elif args.job == 'reconcile-points':
+            drift = reconcile_points(fix=args.fix)
+            for user_id, points, ledger_points in drift:
+                print(f"user {user_id}: points={points} ledger={ledger_points}")
+            action = 'adjusted' if args.fix else 'found'
+            print(f"{len(drift)} mismatched users {action}")
+        elif args.job == 'backfill-daily-activity':
+            written = backfill_daily_activity()
+            print(f"Wrote {written} daily activity rows")
+        elif args.job == 'backfill-streaks':
+            written = backfill_streaks()
+            print(f"Wrote streaks for {written} users")
+        elif args.job == 'rebuild-user-counters':
+            written = rebuild_user_counters()
+            print(f"Wrote counters for {written} users")
+        elif args.job == 'rebuild-score-distributions':
+            written = rebuild_score_distributions()
+            print(f"Wrote {written} score distribution bins")
+        elif args.job == 'award-achievements':
+            awarded = award_all_achievements()
+            print(f"Awarded {awarded} achievements")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Versioned response cache for leaderboard pages.
+
+Cached payloads are keyed by the request parameters and the leaderboard
+version stored in the ``leaderboard_version`` row. Every commit that changes
+leaderboard rows bumps that row in the same transaction (commits that only
+touch counters or rollups leave it alone), so all worker
+processes agree on the version and ETags survive restarts. A process re-reads
+the version right after its own commits and otherwise every
+``check_interval`` seconds; between checks a conditional request can be
+answered with 304 without touching the database.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event
+
+from models import db, LeaderboardVersion
+from activity import leaderboard_changed_users, insert_missing
+
+class LeaderboardCache:
+    """Small LRU of serialized leaderboard pages tagged with a version."""
+
+    def __init__(self, max_entries=256, check_interval=30):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.version = None
+        self.updated_at = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def invalidate(self):
+        """Drop every cached page and re-read the version on next use."""
+        with self._lock:
+            self._checked_at = None
+            self._entries.clear()
+
+    def _fetch_version(self):
+        row = db.session.query(LeaderboardVersion.version, LeaderboardVersion.updated_at).filter_by(id=1).first()
+        return tuple(row) if row else (0, None)
+
+    def current_version(self):
+        """Version of the leaderboard, re-checked against the database once per interval."""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at > self.check_interval:
+            version, updated_at = self._fetch_version()
+            with self._lock:
+                if version != self.version:
+                    self.version = version
+                    self._entries.clear()
+                self.updated_at = updated_at
+                self._checked_at = time.monotonic()
+        return self.version
+
+    def updated_at_iso(self):
+        """Commit time of the last leaderboard change, as of the latest version check."""
+        self.current_version()
+        updated_at = self.updated_at
+        return updated_at.isoformat() if updated_at else None
+
+    def etag(self, version, *key):
+        return 'lb-' + '-'.join(str(part) for part in (version,) + key)
+
+    def get(self, version, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def set(self, version, key, payload):
+        """Cache ``payload`` unless the leaderboard moved past ``version`` while it was built."""
+        if self._fetch_version()[0] != version:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (version, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+leaderboard_cache = LeaderboardCache()
+
+def bump_leaderboard_version():
+    """Advance the shared leaderboard version in the current transaction. The caller commits."""
+    statement = (
+        db.update(LeaderboardVersion)
+        .where(LeaderboardVersion.id == 1)
+        .values(version=LeaderboardVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if not db.session.execute(statement).rowcount:
+        insert_missing(LeaderboardVersion, ['id'], id=1, version=0)
+        db.session.execute(statement)
+
+def _note_changes(session):
+    if leaderboard_changed_users(session):
+        bump_leaderboard_version()
+        session.info['leaderboard_cache_stale'] = True
+
+def _invalidate_pages(session):
+    if session.info.pop('leaderboard_cache_stale', False):
+        leaderboard_cache.invalidate()
+
+def _discard_changes(session, previous_transaction):
+    session.info.pop('leaderboard_cache_stale', None)
+
+def init_leaderboard_cache(app):
+    """Configure the cache and bump the version in every commit that changes the leaderboard.
+
+    Register this after listeners that write in ``before_commit`` (such as
+    achievements) so the version row stays locked only until the commit.
+    """
+    leaderboard_cache.max_entries = app.config.get('LEADERBOARD_CACHE_MAX_ENTRIES', 256)
+    leaderboard_cache.check_interval = app.config.get('LEADERBOARD_CACHE_CHECK_INTERVAL', 30)
+    if not event.contains(db.session, 'before_commit', _note_changes):
+        event.listen(db.session, 'before_commit', _note_changes)
+        event.listen(db.session, 'after_commit', _invalidate_pages)
+        event.listen(db.session, 'after_soft_rollback', _discard_changes)
@@ -0,0 +1,138 @@
+"""
+Debounced background reconciliation of leaderboard rows.
+
+The write path already keeps each leaderboard row current in the
+originating transaction, so this thread only repairs drift (rows changed
+outside the activity helpers, or an incremental average that wandered).
+Commits that touch a user's leaderboard row mark the user dirty. A daemon
+thread wakes every ``interval`` seconds, takes up to ``batch_size`` dirty
+users and compares their rows with the source tables in one read-only
+aggregate; only rows that disagree are rewritten, with one set-based upsert.
+Repeated changes to the same user within an interval cost a single check.
+The same thread loads the rank index at startup and resyncs it every
+``RANK_INDEX_MAX_AGE`` seconds.
+"""
+
+import logging
+import threading
+
+from sqlalchemy import event
+
+from models import db
+from activity import leaderboard_changed_users
+from rank_index import rank_index
+from leaderboard_cache import leaderboard_cache
+
+logger = logging.getLogger(__name__)
+
+class LeaderboardScheduler:
+    """Coalesces "user changed" signals and reconciles them in batches."""
+
+    def __init__(self, interval=10, batch_size=500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark_dirty(self, user_ids):
+        with self._lock:
+            self._dirty.update(user_ids)
+
+    def pending(self):
+        with self._lock:
+            return len(self._dirty)
+
+    def _take_batch(self):
+        with self._lock:
+            batch = []
+            while self._dirty and len(batch) < self.batch_size:
+                batch.append(self._dirty.pop())
+            return batch
+
+    def run_pending(self):
+        """Reconcile every dirty user, one batch at a time. Returns the number of rows repaired."""
+        from routes.leaderboard import find_drifted_users, rebuild_leaderboard
+
+        repaired = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return repaired
+            try:
+                drifted = find_drifted_users(batch)
+                if drifted:
+                    logger.info('Leaderboard rows drifted from source tables (%d users), rebuilding', len(drifted))
+                    rebuild_leaderboard(user_ids=drifted)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.mark_dirty(batch)
+                raise
+
+            if drifted:
+                if rank_index.loaded:
+                    rank_index.refresh_users(drifted)
+                leaderboard_cache.invalidate()
+                repaired += len(drifted)
+
+    def start(self, app):
+        """Start the background thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name='leaderboard-scheduler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                # Load the rank index at startup and resync it here rather than
+                # on a request thread
+                try:
+                    rank_index.ensure_fresh()
+                except Exception:
+                    logger.exception('Rank index load failed')
+                finally:
+                    db.session.remove()
+                try:
+                    self.run_pending()
+                except Exception:
+                    logger.exception('Leaderboard recompute batch failed')
+                finally:
+                    db.session.remove()
+            if self._stop.wait(self.interval):
+                return
+
+leaderboard_scheduler = LeaderboardScheduler()
+
+def _capture_dirty(session):
+    changed = leaderboard_changed_users(session)
+    if changed:
+        session.info.setdefault('leaderboard_scheduler_dirty', set()).update(changed)
+
+def _enqueue_dirty(session):
+    dirty = session.info.pop('leaderboard_scheduler_dirty', None)
+    if dirty:
+        leaderboard_scheduler.mark_dirty(dirty)
+
+def _discard_dirty(session, previous_transaction):
+    session.info.pop('leaderboard_scheduler_dirty', None)
+
+def init_leaderboard_scheduler(app):
+    """Configure the scheduler and hook it to session commits.
+
+    The thread itself is started by ``app.start_background_workers``.
+    """
+    leaderboard_scheduler.interval = app.config.get('LEADERBOARD_RECOMPUTE_INTERVAL', 10)
+    leaderboard_scheduler.batch_size = app.config.get('LEADERBOARD_RECOMPUTE_BATCH_SIZE', 500)
+    if not event.contains(db.session, 'before_commit', _capture_dirty):
+        event.listen(db.session, 'before_commit', _capture_dirty)
+        event.listen(db.session, 'after_commit', _enqueue_dirty)
+        event.listen(db.session, 'after_soft_rollback', _discard_dirty)
@@ -0,0 +1,164 @@
+"""
+Process-wide registry of Hugging Face pipelines.
+
+Models are registered by name up front but loaded only on first use, or
+eagerly by a background warm-up thread (``MODEL_WARMUP``). Each model is
+loaded at most once per process; ``transformers`` itself is only imported
+when the first model loads, so workers that never serve quiz traffic do not
+pay for it. Load state is reported by the health check.
+
+Question generation runs on PyTorch by default. With
+``QUESTION_GENERATION_BACKEND=onnx`` it is served by ONNX Runtime from an
+int8-quantized export (see ``export_onnx_model.py``), which needs the
+optional ``optimum[onnxruntime]`` package.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+class ModelRegistry:
+    """Loads registered pipelines lazily and caches them for the process."""
+
+    def __init__(self):
+        self._specs = {}
+        self._models = {}
+        self._state = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, task, model, loader=None, version=None, **kwargs):
+        """Register a pipeline to be built with ``transformers.pipeline(task, model=model, **kwargs)``.
+
+        ``loader(task, model, **kwargs)`` replaces ``transformers.pipeline``
+        for other backends; ``version`` (default ``model``) identifies the
+        outputs for caching. Registering a name again replaces its model.
+        """
+        with self._lock:
+            self._specs[name] = {
+                'task': task,
+                'model': model,
+                'loader': loader,
+                'version': version or model,
+                'kwargs': kwargs
+            }
+            self._locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._state[name] = {'state': NOT_LOADED}
+
+    def get(self, name):
+        """The loaded pipeline for ``name``, loading it on first use. None if loading failed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            if self._state[name]['state'] == FAILED:
+                return None
+            return self._load(name)
+
+    def _load(self, name):
+        spec = self._specs[name]
+        model_name = spec['model']
+        self._state[name] = {'state': LOADING, 'model': model_name}
+        started = time.monotonic()
+        try:
+            loader = spec['loader']
+            if loader is None:
+                from transformers import pipeline as loader
+            model = loader(spec['task'], model_name, **spec['kwargs'])
+        except Exception as e:
+            logger.warning(f"Could not load model {name} ({model_name}): {str(e)}")
+            self._state[name] = {'state': FAILED, 'model': model_name, 'error': str(e)}
+            return None
+        
+        self._models[name] = model
+        self._state[name] = {
+            'state': READY,
+            'model': model_name,
+            'load_seconds': round(time.monotonic() - started, 2)
+        }
+        return model
+
+    def warm_up(self, names=None):
+        """Load ``names`` (default: every registered model) in a background thread."""
+        names = [name for name in (names or list(self._specs)) if name in self._specs]
+        thread = threading.Thread(
+            target=lambda: [self.get(name) for name in names], name='model-warmup', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def reset(self, name):
+        """Forget a loaded or failed model so the next ``get`` loads it again."""
+        with self._locks[name]:
+            self._models.pop(name, None)
+            self._state[name] = {'state': NOT_LOADED}
+
+    def version(self, name):
+        """Identifier of the model behind ``name``, for keying cached outputs."""
+        return self._specs[name]['version']
+
+    def status(self):
+        """Load state of every registered model, for the health check."""
+        return {
+            name: dict(self._state[name], model=spec['model'], version=spec['version'])
+            for name, spec in self._specs.items()
+        }
+
+def load_onnx_pipeline(task, model_path, **kwargs):
+    """Build a seq2seq pipeline served by ONNX Runtime from an exported model directory."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_path)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    return pipeline(task, model=model, tokenizer=tokenizer, **kwargs)
+
+QUESTION_GENERATION_MODEL = 'valhalla/t5-small-qg-hl'
+
+model_registry = ModelRegistry()
+
+model_registry.register(
+    'question_generation',
+    'text2text-generation',
+    QUESTION_GENERATION_MODEL,
+    tokenizer=QUESTION_GENERATION_MODEL
+)
+model_registry.register(
+    'question_answering',
+    'question-answering',
+    'distilbert-base-cased-distilled-squad'
+)
+
+def use_onnx_question_generation(model_path):
+    """Serve question generation from the ONNX export in ``model_path``."""
+    model_registry.register(
+        'question_generation',
+        'text2text-generation',
+        model_path,
+        loader=load_onnx_pipeline,
+        version=f'{QUESTION_GENERATION_MODEL}+onnx-int8'
+    )
+
+def init_model_registry(app):
+    """Select the question generation backend."""
+    if app.config.get('QUESTION_GENERATION_BACKEND', 'pytorch') == 'onnx':
+        use_onnx_question_generation(app.config['QUESTION_GENERATION_ONNX_PATH'])
+
+def warm_up_models(app):
+    """Start loading the models listed in ``MODEL_WARMUP`` in the background."""
+    warmup = app.config.get('MODEL_WARMUP', '')
+    if not warmup:
+        return
+    names = None if warmup == 'all' else [name.strip() for name in warmup.split(',') if name.strip()]
+    model_registry.warm_up(names)
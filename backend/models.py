@@ -3,7 +3,7 @@ from flask import current_app
 
 # This will be initialized by the app factory
 db = SQLAlchemy()
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
@@ -43,6 +43,9 @@ class User(db.Model):
 
 class Note(db.Model):
     __tablename__ = 'notes'
+    __table_args__ = (
+        db.Index('ix_notes_user_created', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -69,6 +72,9 @@ class Note(db.Model):
 
 class Quiz(db.Model):
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        db.Index('ix_quizzes_creator_created', 'created_by', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -92,8 +98,65 @@ class Quiz(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class QuizGenerationJob(db.Model):
+    """A queued quiz generation request, processed by ``quiz_jobs`` workers."""
+    __tablename__ = 'quiz_generation_jobs'
+    __table_args__ = (
+        db.Index('ix_quiz_generation_jobs_queue', 'status', 'created_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    note_id = db.Column(db.Integer)  # source note, if any; content is copied so the note may be deleted
+    title = db.Column(db.String(200), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    difficulty = db.Column(db.String(20), default='medium')
+    num_questions = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, default=0)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'title': self.title,
+            'subject': self.subject,
+            'difficulty': self.difficulty,
+            'num_questions': self.num_questions,
+            'note_id': self.note_id,
+            'quiz_id': self.quiz_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class GeneratedQuestionCache(db.Model):
+    """Generated questions cached by content hash (see ``question_cache``)."""
+    __tablename__ = 'generated_question_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False, unique=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    num_questions = db.Column(db.Integer, nullable=False)
+    difficulty = db.Column(db.String(20), nullable=False)
+    model_version = db.Column(db.String(200), nullable=False)
+    questions = db.Column(db.JSON, nullable=False)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_user_completed', 'user_id', 'completed_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -119,6 +182,9 @@ class QuizAttempt(db.Model):
 
 class PastQuestion(db.Model):
     __tablename__ = 'past_questions'
+    __table_args__ = (
+        db.Index('ix_past_questions_listing', 'year', 'download_count', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -147,20 +213,23 @@ class PastQuestion(db.Model):
 
 class Leaderboard(db.Model):
     __tablename__ = 'leaderboard'
+    __table_args__ = (
+        # Ranks are derived on read by counting entries ahead of a user
+        db.Index('ix_leaderboard_ranking', 'total_points', 'average_score', 'quizzes_completed', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
     total_points = db.Column(db.Integer, default=0)
     quizzes_completed = db.Column(db.Integer, default=0)
     notes_uploaded = db.Column(db.Integer, default=0)
     average_score = db.Column(db.Float, default=0.0)
-    rank = db.Column(db.Integer)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
     user = db.relationship('User', backref='leaderboard_entry', lazy=True)
     
-    def to_dict(self):
+    def to_dict(self, rank=None):
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -170,7 +239,203 @@ class Leaderboard(db.Model):
             'total_points': self.total_points,
             'quizzes_completed': self.quizzes_completed,
             'notes_uploaded': self.notes_uploaded,
-            'average_score': self.average_score,
-            'rank': self.rank,
+            'average_score': round(self.average_score, 2),
+            'rank': rank,
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class LeaderboardVersion(db.Model):
+    """Single-row counter bumped by every commit that changes leaderboard rows.
+
+    Worker processes compare it to tell whether their cached pages are
+    stale, so ETags derived from it stay valid across workers and restarts.
+    """
+    __tablename__ = 'leaderboard_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SubjectLeaderboard(db.Model):
+    """Per-subject quiz aggregates, maintained as attempts are submitted."""
+    __tablename__ = 'subject_leaderboard'
+    __table_args__ = (
+        db.UniqueConstraint('subject', 'user_id', name='uq_subject_leaderboard_subject_user'),
+        db.Index('ix_subject_leaderboard_ranking', 'subject', 'total_points', 'average_score', 'attempts', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(100), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0)
+    average_score = db.Column(db.Float, default=0.0)
+    total_points = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationship
+    user = db.relationship('User', lazy=True)
+    
+    def to_dict(self, rank=None):
+        return {
+            'subject': self.subject,
+            'user_id': self.user_id,
+            'username': self.user.username,
+            'first_name': self.user.first_name,
+            'last_name': self.user.last_name,
+            'attempts': self.attempts,
+            'average_score': round(self.average_score, 2),
+            'total_points': self.total_points,
+            'rank': rank,
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class PointsBucket(db.Model):
+    """Points earned by a user per day, folded into weekly buckets once old."""
+    __tablename__ = 'points_buckets'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'granularity', 'bucket_date', name='uq_points_buckets_user_bucket'),
+        # Window sums scan a bounded date range and read points from the index
+        db.Index('ix_points_buckets_window', 'bucket_date', 'user_id', 'points'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    granularity = db.Column(db.String(10), nullable=False, default='day')  # day, week
+    bucket_date = db.Column(db.Date, nullable=False)  # the day, or the Monday of the week
+    points = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'granularity': self.granularity,
+            'bucket_date': self.bucket_date.isoformat(),
+            'points': self.points
+        }
+
+class PointsEvent(db.Model):
+    """Append-only ledger of point awards; ``User.points`` is its running total."""
+    __tablename__ = 'points_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    points = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(50), nullable=False)  # note_created, quiz_generated, quiz_attempt, ...
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'points': self.points,
+            'reason': self.reason,
+            'created_at': self.created_at.isoformat()
+        }
+
+class UserDailyActivity(db.Model):
+    """Per-user, per-day (UTC) activity counts, maintained as activity happens."""
+    __tablename__ = 'user_daily_activity'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_user_daily_activity_user_day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    notes_created = db.Column(db.Integer, default=0)
+    quizzes_taken = db.Column(db.Integer, default=0)
+    quizzes_created = db.Column(db.Integer, default=0)
+    points = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat(),
+            'notes_created': self.notes_created,
+            'quizzes_taken': self.quizzes_taken,
+            'quizzes_created': self.quizzes_created,
+            'points': self.points
+        }
+
+class ScoreDistributionBin(db.Model):
+    """Attempt count for one percentage bin of a score distribution (see ``score_distribution``)."""
+    __tablename__ = 'score_distribution_bins'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'bin', name='uq_score_distribution_bins_scope_bin'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(100), nullable=False)  # quiz subject, or '*' for all attempts
+    bin = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class UserCounters(db.Model):
+    """Per-user activity totals, kept current by write-through from ``activity``."""
+    __tablename__ = 'user_counters'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
+    notes_count = db.Column(db.Integer, default=0)
+    quizzes_created = db.Column(db.Integer, default=0)
+    quiz_attempts = db.Column(db.Integer, default=0)
+    perfect_scores = db.Column(db.Integer, default=0)
+    score_total = db.Column(db.Float, default=0.0)  # sum of attempt percentages
+    past_questions_uploaded = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'notes_count': self.notes_count,
+            'quizzes_created': self.quizzes_created,
+            'quiz_attempts': self.quiz_attempts,
+            'perfect_scores': self.perfect_scores,
+            'average_score': round(self.score_total / self.quiz_attempts, 2) if self.quiz_attempts else 0.0,
+            'past_questions_uploaded': self.past_questions_uploaded,
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class UserStreak(db.Model):
+    """Consecutive active days (UTC) for a user, extended as activity is recorded.
+
+    ``current_streak`` is as of ``last_active_day``; it has lapsed once that
+    day is older than yesterday (see ``effective_current_streak``).
+    """
+    __tablename__ = 'user_streaks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
+    current_streak = db.Column(db.Integer, default=0)
+    longest_streak = db.Column(db.Integer, default=0)
+    last_active_day = db.Column(db.Date)
+    
+    def effective_current_streak(self, today=None):
+        today = today or datetime.utcnow().date()
+        if self.last_active_day and self.last_active_day >= today - timedelta(days=1):
+            return self.current_streak
+        return 0
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'current_streak': self.effective_current_streak(),
+            'longest_streak': self.longest_streak,
+            'last_active_day': self.last_active_day.isoformat() if self.last_active_day else None
+        }
+
+class UserAchievement(db.Model):
+    """An achievement a user has earned (see ``achievements.ACHIEVEMENT_RULES``)."""
+    __tablename__ = 'user_achievements'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'achievement_key', name='uq_user_achievements_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    achievement_key = db.Column(db.String(50), nullable=False)
+    earned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'achievement_key': self.achievement_key,
+            'earned_at': self.earned_at.isoformat()
+        }
@@ -0,0 +1,32 @@
+"""
+Counting the SQL statements a block of code sends to the database.
+
+Shared by the query-count tests and the benchmarks.
+"""
+
+from sqlalchemy import event
+
+class StatementCounter:
+    """Records SQL statements sent through ``engine`` while the context is active.
+
+    Each time the context is entered the count starts again from zero.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
@@ -0,0 +1,187 @@
+"""
+Content-hash cache for generated quiz questions.
+
+Entries are keyed by (normalized content hash, number of questions,
+difficulty, model version), so editing the text, asking for a different
+quiz or switching models misses, while regenerating from the same note or
+pasted text is served without running the model. A small in-process LRU
+answers repeat hits without a query; their hit counts and last-use times
+are written back to the database in one batch every ``flush_interval``
+seconds, so database recency reflects memory hits too. The
+``generated_question_cache`` table shares entries across processes and
+restarts and is trimmed back to ``max_entries`` rows, least recently used
+first, once every ``evict_every`` stores. Writes go through the caller's
+session and are committed with the quiz that uses them.
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from models import db, GeneratedQuestionCache
+
+def normalize_content(text):
+    """Collapse whitespace so formatting-only differences share an entry."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+def cache_key(content, num_questions, difficulty, model_version):
+    content_hash = hashlib.sha256(normalize_content(content).encode('utf-8')).hexdigest()
+    key = f'{content_hash}:{num_questions}:{difficulty}:{model_version}'
+    return content_hash, hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+class QuestionCache:
+    """Two-level (memory, database) LRU of generated question lists."""
+
+    def __init__(self, max_entries=5000, memory_entries=128, flush_interval=60, evict_every=100):
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.flush_interval = flush_interval
+        self.evict_every = evict_every
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._touched = {}  # cache_key -> (hits, last used) from memory hits not yet written
+        self._flushed_at = time.monotonic()
+        self._stores_since_evict = 0
+        self._stats = {'memory_hits': 0, 'database_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _remember(self, key, questions):
+        with self._lock:
+            self._memory[key] = questions
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, content, num_questions, difficulty, model_version):
+        """Cached questions for the request, or None on a miss."""
+        if not self.enabled:
+            return None
+        _, key = cache_key(content, num_questions, difficulty, model_version)
+        
+        with self._lock:
+            questions = self._memory.get(key)
+            if questions is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                self._touched[key] = (self._touched.get(key, (0, None))[0] + 1, datetime.utcnow())
+        if questions is not None:
+            if time.monotonic() - self._flushed_at > self.flush_interval:
+                self.flush_touched()
+            return copy.deepcopy(questions)
+        
+        entry = GeneratedQuestionCache.query.filter_by(cache_key=key).first()
+        if entry is None:
+            self._count('misses')
+            return None
+        
+        db.session.execute(
+            db.update(GeneratedQuestionCache)
+            .where(GeneratedQuestionCache.id == entry.id)
+            .values(hits=GeneratedQuestionCache.hits + 1, last_used_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self._remember(key, entry.questions)
+        self._count('database_hits')
+        return copy.deepcopy(entry.questions)
+
+    def set(self, content, num_questions, difficulty, model_version, questions):
+        """Store freshly generated questions, evicting old entries every ``evict_every`` stores."""
+        if not self.enabled or not questions:
+            return
+        content_hash, key = cache_key(content, num_questions, difficulty, model_version)
+        now = datetime.utcnow()
+        
+        # Concurrent misses for the same key may both store; the later write wins
+        if db.engine.dialect.name == 'mysql':
+            upsert = 'ON DUPLICATE KEY UPDATE questions = VALUES(questions), last_used_at = VALUES(last_used_at)'
+        else:
+            upsert = ('ON CONFLICT (cache_key) '
+                      'DO UPDATE SET questions = excluded.questions, last_used_at = excluded.last_used_at')
+        db.session.execute(db.text(f"""
+            INSERT INTO generated_question_cache
+                (cache_key, content_hash, num_questions, difficulty, model_version, questions, hits,
+                 created_at, last_used_at)
+            VALUES
+                (:cache_key, :content_hash, :num_questions, :difficulty, :model_version, :questions, 0,
+                 :now, :now)
+            {upsert}
+        """), {
+            'cache_key': key,
+            'content_hash': content_hash,
+            'num_questions': num_questions,
+            'difficulty': difficulty,
+            'model_version': model_version,
+            'questions': json.dumps(questions),
+            'now': now
+        })
+        self._remember(key, copy.deepcopy(questions))
+        with self._lock:
+            self._stats['stores'] += 1
+            self._stores_since_evict += 1
+            evict_due = self._stores_since_evict >= self.evict_every
+            if evict_due:
+                self._stores_since_evict = 0
+        if evict_due:
+            self.evict()
+
+    def flush_touched(self):
+        """Write pending memory-hit counts and last-use times in one batch. Returns the entries updated."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        if not touched:
+            return 0
+        table = GeneratedQuestionCache.__table__
+        db.session.execute(
+            db.update(table)
+            .where(table.c.cache_key == db.bindparam('key'))
+            .values(hits=table.c.hits + db.bindparam('new_hits'), last_used_at=db.bindparam('used_at')),
+            [{'key': key, 'new_hits': hits, 'used_at': used_at} for key, (hits, used_at) in touched.items()]
+        )
+        return len(touched)
+
+    def evict(self):
+        """Delete the least recently used rows beyond ``max_entries``. Returns the number removed."""
+        self.flush_touched()
+        stale_ids = [row_id for (row_id,) in db.session.query(GeneratedQuestionCache.id)
+                     .order_by(GeneratedQuestionCache.last_used_at.desc(), GeneratedQuestionCache.id.desc())
+                     .offset(self.max_entries)]
+        if not stale_ids:
+            return 0
+        db.session.execute(
+            db.delete(GeneratedQuestionCache)
+            .where(GeneratedQuestionCache.id.in_(stale_ids))
+            .execution_options(synchronize_session=False)
+        )
+        self._count('evictions', len(stale_ids))
+        return len(stale_ids)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        """Hit and miss counts for this process since startup."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['database_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['database_hits']) / lookups, 4) if lookups else None
+        return stats
+
+question_cache = QuestionCache()
+
+def init_question_cache(app):
+    """Configure the generated question cache from the app config."""
+    question_cache.enabled = app.config.get('QUESTION_CACHE_ENABLED', True)
+    question_cache.max_entries = app.config.get('QUESTION_CACHE_MAX_ENTRIES', 5000)
+    question_cache.memory_entries = app.config.get('QUESTION_CACHE_MEMORY_ENTRIES', 128)
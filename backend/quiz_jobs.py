@@ -0,0 +1,188 @@
+"""
+Database-backed queue for quiz generation.
+
+``POST /api/quiz/generate?mode=async`` (and ``/from-note/<id>?mode=async``)
+store a ``QuizGenerationJob`` and return immediately. A bounded pool of
+daemon worker threads in each process claims queued jobs with a conditional
+UPDATE, so several processes can share the queue without a broker or row
+locks. The worker generates the questions, creates the ``Quiz`` and awards
+points in one transaction. Jobs whose worker died are reclaimed after
+``timeout`` seconds and failed after ``max_attempts`` tries.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import db, Quiz, QuizGenerationJob
+from activity import record_quiz_generated
+
+logger = logging.getLogger(__name__)
+
+class QuizJobWorkers:
+    """Pool of threads that process queued quiz generation jobs."""
+
+    def __init__(self, pool_size=2, poll_interval=2, timeout=300, max_attempts=3):
+        self.pool_size = pool_size
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def enqueue(self, user_id, content, title, subject, difficulty, num_questions, note_id=None):
+        """Add a job to the session; it becomes visible to workers when the caller commits."""
+        job = QuizGenerationJob(
+            user_id=user_id,
+            note_id=note_id,
+            title=title,
+            subject=subject,
+            difficulty=difficulty,
+            num_questions=num_questions,
+            content=content,
+            status='queued',
+            attempts=0
+        )
+        db.session.add(job)
+        db.session.info['quiz_jobs_enqueued'] = True
+        return job
+
+    def notify(self):
+        self._wakeup.set()
+
+    def claim_next(self):
+        """Claim the oldest runnable job for this worker, or return None."""
+        stale_before = datetime.utcnow() - timedelta(seconds=self.timeout)
+        runnable = db.or_(
+            QuizGenerationJob.status == 'queued',
+            db.and_(QuizGenerationJob.status == 'running', QuizGenerationJob.started_at < stale_before)
+        )
+        while True:
+            candidate = db.session.query(QuizGenerationJob.id, QuizGenerationJob.status)\
+                .filter(runnable)\
+                .order_by(QuizGenerationJob.created_at, QuizGenerationJob.id)\
+                .first()
+            if candidate is None:
+                return None
+            
+            # Only one worker can move the job out of the state it was read in
+            condition = QuizGenerationJob.status == candidate.status
+            if candidate.status == 'running':
+                condition = db.and_(condition, QuizGenerationJob.started_at < stale_before)
+            result = db.session.execute(
+                db.update(QuizGenerationJob)
+                .where(QuizGenerationJob.id == candidate.id, condition)
+                .values(
+                    status='running',
+                    started_at=datetime.utcnow(),
+                    attempts=QuizGenerationJob.attempts + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(QuizGenerationJob, candidate.id)
+
+    def run_job(self, job):
+        """Generate the quiz for a claimed job and record the outcome."""
+        from routes.quiz import generate_questions_from_text
+
+        if job.attempts > self.max_attempts:
+            self._finish(job, 'failed', error='Gave up after repeated worker failures')
+            return job
+        
+        try:
+            questions = generate_questions_from_text(job.content, job.num_questions, difficulty=job.difficulty)
+            if not questions:
+                self._finish(job, 'failed', error='Could not generate questions from the provided content')
+                return job
+            
+            quiz = Quiz(
+                title=job.title,
+                subject=job.subject,
+                difficulty=job.difficulty,
+                questions=questions,
+                created_by=job.user_id
+            )
+            db.session.add(quiz)
+            db.session.flush()
+            
+            # Award points in the same transaction that creates the quiz
+            record_quiz_generated(job.user_id, from_note=job.note_id is not None)
+            self._finish(job, 'succeeded', quiz_id=quiz.id)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f'Quiz generation job {job.id} failed')
+            job = db.session.get(QuizGenerationJob, job.id)
+            self._finish(job, 'failed', error=str(e))
+        return job
+
+    def _finish(self, job, status, quiz_id=None, error=None):
+        job.status = status
+        job.quiz_id = quiz_id
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def run_pending(self):
+        """Process jobs until the queue is empty. Returns the number processed."""
+        processed = 0
+        while True:
+            job = self.claim_next()
+            if job is None:
+                return processed
+            self.run_job(job)
+            processed += 1
+
+    def start(self, app):
+        """Start the worker threads (once per process)."""
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.pool_size):
+            thread = threading.Thread(
+                target=self._run, args=(app,), name=f'quiz-job-worker-{i}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self, app):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.run_pending()
+                except Exception:
+                    logger.exception('Quiz generation worker failed')
+                finally:
+                    db.session.remove()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+quiz_job_workers = QuizJobWorkers()
+
+def _notify_workers(session):
+    if session.info.pop('quiz_jobs_enqueued', False):
+        quiz_job_workers.notify()
+
+def _discard_enqueued(session, previous_transaction):
+    session.info.pop('quiz_jobs_enqueued', None)
+
+def init_quiz_jobs(app):
+    """Configure the worker pool and wake it on enqueue.
+
+    The worker threads are started by ``app.start_background_workers``.
+    """
+    quiz_job_workers.pool_size = app.config.get('QUIZ_JOB_WORKERS', 2)
+    quiz_job_workers.poll_interval = app.config.get('QUIZ_JOB_POLL_INTERVAL', 2)
+    quiz_job_workers.timeout = app.config.get('QUIZ_JOB_TIMEOUT', 300)
+    if not event.contains(db.session, 'after_commit', _notify_workers):
+        event.listen(db.session, 'after_commit', _notify_workers)
+        event.listen(db.session, 'after_soft_rollback', _discard_enqueued)
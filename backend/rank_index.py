@@ -0,0 +1,316 @@
+"""
+In-process rank index for the leaderboard.
+
+Keeps every leaderboard entry in an indexable skiplist ordered by the ranking
+sort tuple, so rank-of-user, top-K and neighbor lookups are O(log n) without
+touching the database. The index is loaded from the ``leaderboard`` table by
+the leaderboard scheduler thread at startup (or on first use if that has not
+happened yet), updated from committed score changes, and periodically checked
+against the database so writes made by other worker processes are picked up.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+
+from sqlalchemy import event
+
+from models import db, Leaderboard
+from activity import leaderboard_changed_users
+
+logger = logging.getLogger(__name__)
+
+class _Infinity:
+    """Sentinel key that sorts after every real key."""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return other is self
+
+    def __gt__(self, other):
+        return other is not self
+
+    def __ge__(self, other):
+        return True
+
+_END = _Infinity()
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, next_nodes, widths):
+        self.key = key
+        self.next = next_nodes
+        self.width = widths
+
+class IndexableSkiplist:
+    """Sorted collection of unique keys with O(log n) insert, remove and rank.
+
+    Each link stores how many bottom-level nodes it skips, which lets the list
+    answer "how many keys are smaller than X" and "what is the i-th key" in
+    logarithmic time (an order-statistic skiplist).
+    """
+
+    def __init__(self, expected_size=1 << 16):
+        self.size = 0
+        self.max_levels = max(1, int(math.log2(max(expected_size, 2))) + 1)
+        nil = _Node(_END, [], [])
+        self.head = _Node(None, [nil] * self.max_levels, [1] * self.max_levels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError('skiplist index out of range')
+        node = self.head
+        index += 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def bisect_left(self, key):
+        """Number of keys strictly less than ``key``."""
+        node = self.head
+        position = 0
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def insert(self, key):
+        chain = [None] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        height = min(self.max_levels, 1 - int(math.log(random.random() or 1e-12, 2.0)))
+        new_node = _Node(key, [None] * height, [None] * height)
+        steps = 0
+        for level in range(height):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.max_levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target.key is _END or target.key != key:
+            raise KeyError(key)
+
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.max_levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def islice(self, start, stop):
+        """Keys at positions ``start`` (inclusive) to ``stop`` (exclusive)."""
+        start = max(start, 0)
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+        node = self.head
+        index = start + 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        keys = []
+        for _ in range(stop - start):
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+def sort_key(user_id, total_points, average_score, quizzes_completed):
+    """Ascending key equivalent to the leaderboard's descending sort order."""
+    return (-(total_points or 0), -(average_score or 0.0), -(quizzes_completed or 0), -user_id)
+
+class RankIndex:
+    """Thread-safe rank index over leaderboard entries."""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self.loaded_at = None
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._keys = {}
+        self._skiplist = IndexableSkiplist()
+
+    def _load_rows(self, rows):
+        rows = list(rows)
+        skiplist = IndexableSkiplist(expected_size=max(len(rows) * 2, 1 << 16))
+        keys = {}
+        for row in rows:
+            key = sort_key(*row)
+            keys[row[0]] = key
+            skiplist.insert(key)
+        with self._lock:
+            self._skiplist = skiplist
+            self._keys = keys
+            self.loaded_at = time.monotonic()
+
+    def _fetch_rows(self, user_ids=None, session=None):
+        query = (session or db.session).query(
+            Leaderboard.user_id,
+            Leaderboard.total_points,
+            Leaderboard.average_score,
+            Leaderboard.quizzes_completed
+        )
+        if user_ids is not None:
+            query = query.filter(Leaderboard.user_id.in_(user_ids))
+        return query.all()
+
+    def load(self):
+        """(Re)load the whole index from the ``leaderboard`` table."""
+        self._load_rows(self._fetch_rows())
+
+    @property
+    def loaded(self):
+        """Whether the index can answer queries. Requests check this instead of loading."""
+        return self.loaded_at is not None
+
+    def invalidate(self):
+        """Force a reload on next use, e.g. after a bulk rebuild."""
+        with self._lock:
+            self.loaded_at = None
+
+    def resync(self):
+        """Reload the index from the database, logging how far it had drifted."""
+        rows = self._fetch_rows()
+        mismatches = self.verify(rows)
+        if mismatches:
+            logger.info('Rank index drifted from database (%d entries), reloading', mismatches)
+        self._load_rows(rows)
+
+    def ensure_fresh(self):
+        """Load on first use and resync once the index is older than ``max_age``.
+
+        Reloads are single-flight: the first load makes concurrent callers
+        wait for it, but while a resync is running everyone else keeps
+        serving the current index.
+        """
+        loaded_at = self.loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self.loaded_at is None:
+                    self.load()
+        elif time.monotonic() - loaded_at > self.max_age and self._reload_lock.acquire(blocking=False):
+            try:
+                if self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age:
+                    self.resync()
+            finally:
+                self._reload_lock.release()
+
+    def update(self, user_id, total_points, average_score, quizzes_completed):
+        key = sort_key(user_id, total_points, average_score, quizzes_completed)
+        with self._lock:
+            old_key = self._keys.get(user_id)
+            if old_key == key:
+                return
+            if old_key is not None:
+                self._skiplist.remove(old_key)
+            self._skiplist.insert(key)
+            self._keys[user_id] = key
+
+    def refresh_users(self, user_ids, session=None):
+        """Re-read ``user_ids``' leaderboard rows and move them to their current positions."""
+        for row in self._fetch_rows(list(user_ids), session):
+            self.update(*row)
+
+    def discard(self, user_id):
+        with self._lock:
+            old_key = self._keys.pop(user_id, None)
+            if old_key is not None:
+                self._skiplist.remove(old_key)
+
+    def __len__(self):
+        return len(self._skiplist)
+
+    def rank_of(self, user_id):
+        """RANK()-style rank: 1 + number of entries with a strictly better score."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._skiplist.bisect_left(key[:3] + (-math.inf,)) + 1
+
+    def top(self, limit):
+        """User ids of the first ``limit`` entries in leaderboard order."""
+        with self._lock:
+            return [-key[3] for key in self._skiplist.islice(0, limit)]
+
+    def neighbors(self, user_id, above=2, below=2):
+        """User ids around ``user_id`` in leaderboard order, including the user."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return []
+            position = self._skiplist.bisect_left(key)
+            keys = self._skiplist.islice(position - above, position + below + 1)
+            return [-k[3] for k in keys]
+
+    def ranks_for(self, user_ids):
+        """Map user id to rank for every id present in the index."""
+        with self._lock:
+            return {
+                user_id: self._skiplist.bisect_left(self._keys[user_id][:3] + (-math.inf,)) + 1
+                for user_id in user_ids if user_id in self._keys
+            }
+
+    def verify(self, rows=None):
+        """Compare the index with the database and return the number of mismatched entries."""
+        if rows is None:
+            rows = self._fetch_rows()
+        expected = {row[0]: sort_key(*row) for row in rows}
+        with self._lock:
+            keys = dict(self._keys)
+        mismatches = sum(1 for user_id, key in expected.items() if keys.get(user_id) != key)
+        mismatches += sum(1 for user_id in keys if user_id not in expected)
+        return mismatches
+
+rank_index = RankIndex()
+
+def _capture_changes(session):
+    changed = leaderboard_changed_users(session)
+    if changed and rank_index.loaded_at is not None:
+        session.info['rank_index_pending'] = rank_index._fetch_rows(list(changed), session)
+
+def _apply_changes(session):
+    for row in session.info.pop('rank_index_pending', ()):
+        rank_index.update(*row)
+
+def _discard_changes(session, previous_transaction):
+    session.info.pop('rank_index_pending', None)
+
+def init_rank_index(app):
+    """Configure the index and hook it to session commits."""
+    rank_index.max_age = app.config.get('RANK_INDEX_MAX_AGE', 300)
+    if not event.contains(db.session, 'before_commit', _capture_changes):
+        event.listen(db.session, 'before_commit', _capture_changes)
+        event.listen(db.session, 'after_commit', _apply_changes)
+        event.listen(db.session, 'after_soft_rollback', _discard_changes)
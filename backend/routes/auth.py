@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models import User, db
+from activity import record_user_registered
 from security import limiter, require_json, validate_request_data, InputValidator, log_security_event
 from datetime import timedelta
 import re
@@ -63,6 +64,8 @@ def register():
         user.set_password(password)
         
         db.session.add(user)
+        db.session.flush()
+        record_user_registered(user.id)
         db.session.commit()
         
         log_security_event('user_registered', {'user_id': user.id, 'username': username})
@@ -1,11 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Leaderboard, User, QuizAttempt, Note, db
+from models import Leaderboard, SubjectLeaderboard, PointsBucket, User, QuizAttempt, Note, db
+from activity import POINTS_PER_CORRECT_ANSWER, mark_leaderboard_changed
 from security import limiter
+from rank_index import rank_index
+from leaderboard_cache import leaderboard_cache, bump_leaderboard_version
+from leaderboard_scheduler import leaderboard_scheduler
+from utils import keyset_paginate, include_total_requested
 from sqlalchemy import func, desc
+from datetime import datetime, timedelta
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+MAX_WINDOW_DAYS = 365
+
 def update_user_leaderboard_stats(user_id):
     """Update leaderboard statistics for a user"""
     try:
@@ -36,6 +44,7 @@ def update_user_leaderboard_stats(user_id):
         leaderboard_entry.quizzes_completed = quizzes_completed
         leaderboard_entry.notes_uploaded = notes_uploaded
         leaderboard_entry.average_score = average_score
+        mark_leaderboard_changed(user_id)
         
         db.session.commit()
         
@@ -43,25 +52,263 @@ def update_user_leaderboard_stats(user_id):
         db.session.rollback()
         print(f"Error updating leaderboard stats: {e}")
 
-def update_all_ranks():
-    """Update ranks for all users in leaderboard"""
-    try:
-        # Get all leaderboard entries ordered by total points (desc), then by average score (desc)
-        entries = Leaderboard.query.order_by(
-            desc(Leaderboard.total_points),
-            desc(Leaderboard.average_score),
-            desc(Leaderboard.quizzes_completed)
-        ).all()
-        
-        # Update ranks
-        for index, entry in enumerate(entries, 1):
-            entry.rank = index
-        
-        db.session.commit()
-        
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error updating ranks: {e}")
+# Per-user aggregates over users, quiz_attempts and notes, computed in one pass.
+# The {attempts_filter}/{notes_filter}/{users_filter} conditions let a partial
+# rebuild read only its users' rows (through the user_id-leading indexes).
+LEADERBOARD_STATS_SQL = """
+    SELECT u.id AS user_id,
+           COALESCE(u.points, 0) AS total_points,
+           COALESCE(a.quizzes_completed, 0) AS quizzes_completed,
+           COALESCE(n.notes_uploaded, 0) AS notes_uploaded,
+           COALESCE(a.average_score, 0.0) AS average_score
+    FROM users u
+    LEFT JOIN (
+        SELECT user_id,
+               COUNT(*) AS quizzes_completed,
+               AVG(score * 100.0 / total_questions) AS average_score
+        FROM quiz_attempts
+        WHERE {attempts_filter}
+        GROUP BY user_id
+    ) a ON a.user_id = u.id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS notes_uploaded
+        FROM notes
+        WHERE {notes_filter}
+        GROUP BY user_id
+    ) n ON n.user_id = u.id
+    WHERE {users_filter}
+"""
+
+def _leaderboard_stats_sql(user_ids=None):
+    """Stats query for every user, or only for the users bound to ``:user_ids``."""
+    if user_ids is None:
+        return LEADERBOARD_STATS_SQL.format(attempts_filter='1 = 1', notes_filter='1 = 1', users_filter='1 = 1')
+    return LEADERBOARD_STATS_SQL.format(
+        attempts_filter='user_id IN :user_ids',
+        notes_filter='user_id IN :user_ids',
+        users_filter='u.id IN :user_ids'
+    )
+
+LEADERBOARD_STAT_COLUMNS = ('total_points', 'quizzes_completed', 'notes_uploaded', 'average_score')
+
+def _upsert_clause(dialect, conflict_columns, updated_columns):
+    if dialect == 'mysql':
+        return 'ON DUPLICATE KEY UPDATE ' + ', '.join(f'{col} = VALUES({col})' for col in updated_columns)
+    return (
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET "
+        + ', '.join(f'{col} = excluded.{col}' for col in updated_columns)
+    )
+
+def ranking_columns(model=Leaderboard):
+    """Columns users are ranked by, highest first, matching ``ix_leaderboard_ranking``.
+
+    The trailing ``user_id`` only breaks ties so that pages are stable; it
+    does not affect the rank number itself.
+    """
+    return (model.total_points, model.average_score, model.quizzes_completed, model.user_id)
+
+def ranking_key(model=Leaderboard):
+    """Row value compared to decide whether one entry ranks ahead of another."""
+    return db.tuple_(*ranking_columns(model)[:3])
+
+def ranking_order(model=Leaderboard):
+    return [desc(column) for column in ranking_columns(model)]
+
+def rank_column():
+    """Rank of the outer ``Leaderboard`` row: 1 + entries strictly ahead of it.
+
+    This gives the same result as ``RANK() OVER (ORDER BY total_points DESC,
+    average_score DESC, quizzes_completed DESC)``. It runs as an index range
+    count on ``ix_leaderboard_ranking``, so looking up one user's rank never
+    scans or rewrites the whole table.
+    """
+    ahead = db.aliased(Leaderboard)
+    return (
+        db.select(func.count() + 1)
+        .where(ranking_key(ahead) > ranking_key(Leaderboard))
+        .correlate(Leaderboard)
+        .scalar_subquery()
+        .label('rank')
+    )
+
+def rank_window():
+    """``RANK()`` window for ordered listings, where the whole page shares one sort."""
+    return func.rank().over(order_by=ranking_order()[:3]).label('rank')
+
+def get_ranked_entry(user_id):
+    """Fetch a user's leaderboard entry and rank in one statement."""
+    return db.session.query(Leaderboard, rank_column())\
+        .filter(Leaderboard.user_id == user_id).first()
+
+def get_indexed_entry(user_id):
+    """Fetch a user's leaderboard entry and rank it with the in-process rank index.
+
+    The index is loaded and resynced by the leaderboard scheduler thread, never
+    on a request. Until it is loaded the rank comes from ``rank_column``.
+    """
+    if not rank_index.loaded:
+        return get_ranked_entry(user_id)
+    
+    entry = Leaderboard.query.filter_by(user_id=user_id).first()
+    if not entry:
+        return None
+    
+    # The user's own row is read fresh, so their rank always reflects their
+    # latest score even if it was written by another worker process
+    rank_index.update(entry.user_id, entry.total_points, entry.average_score, entry.quizzes_completed)
+    return entry, rank_index.rank_of(user_id)
+
+def get_ranked_neighbors(entry, rank, above=2, below=2):
+    """``(entry, rank)`` rows around ``entry`` in leaderboard order, including it.
+
+    Seeks both ways from the entry on ``ix_leaderboard_ranking``; used while
+    the rank index is not loaded.
+    """
+    position = db.tuple_(*ranking_columns())
+    key = db.tuple_(*(getattr(entry, column.key) for column in ranking_columns()))
+    ahead = db.session.query(Leaderboard, rank_column())\
+        .filter(position > key)\
+        .order_by(*ranking_columns())\
+        .limit(above).all()
+    behind = db.session.query(Leaderboard, rank_column())\
+        .filter(position < key)\
+        .order_by(*ranking_order())\
+        .limit(below).all()
+    return ahead[::-1] + [(entry, rank)] + behind
+
+def get_entries(user_ids):
+    """Load leaderboard entries for ``user_ids`` with one query, keeping their order."""
+    if not user_ids:
+        return []
+    entries = {
+        entry.user_id: entry
+        for entry in Leaderboard.query.filter(Leaderboard.user_id.in_(user_ids)).all()
+    }
+    return [entries[user_id] for user_id in user_ids if user_id in entries]
+
+def get_window_leaderboard(days, page, per_page):
+    """Rank users by points earned over the last ``days`` days (today included).
+
+    Sums at most ``days`` daily buckets per user from the points ledger. Past
+    the bucket retention period only weekly buckets remain, and a week is
+    counted when its Monday falls inside the window.
+    """
+    start = datetime.utcnow().date() - timedelta(days=days - 1)
+    window_points = func.sum(PointsBucket.points)
+    
+    page_rows = db.session.query(
+        PointsBucket.user_id,
+        window_points.label('points'),
+        func.rank().over(order_by=desc(window_points)).label('rank')
+    )\
+        .filter(PointsBucket.bucket_date >= start)\
+        .group_by(PointsBucket.user_id)\
+        .having(window_points > 0)\
+        .order_by(desc(window_points), PointsBucket.user_id)\
+        .paginate(page=page, per_page=per_page, error_out=False)
+    
+    users = {user.id: user for user in User.query.filter(
+        User.id.in_([row.user_id for row in page_rows.items])
+    ).all()}
+    
+    return {
+        'window_days': days,
+        'since': start.isoformat(),
+        'leaderboard': [{
+            'user_id': row.user_id,
+            'username': users[row.user_id].username,
+            'first_name': users[row.user_id].first_name,
+            'last_name': users[row.user_id].last_name,
+            'points': int(row.points),
+            'rank': row.rank
+        } for row in page_rows.items],
+        'total': page_rows.total,
+        'pages': page_rows.pages,
+        'current_page': page,
+        'per_page': per_page
+    }
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+def rebuild_leaderboard(user_ids=None):
+    """Rebuild leaderboard rows with a single INSERT ... SELECT.
+
+    Stats for all users are aggregated in one grouped query and upserted into
+    ``leaderboard``. SQLite (3.24+) and PostgreSQL use ``ON CONFLICT``;
+    MySQL uses ``ON DUPLICATE KEY UPDATE``. Ranks are not stored; they are
+    derived on read (see ``rank_column``). Pass ``user_ids`` to rebuild only
+    those users' rows. The shared leaderboard version is bumped in the same
+    transaction; the caller commits.
+    """
+    columns = ', '.join(LEADERBOARD_STAT_COLUMNS)
+    upsert = _upsert_clause(_dialect_name(), ('user_id',), LEADERBOARD_STAT_COLUMNS + ('updated_at',))
+
+    # "WHERE 1 = 1" keeps SQLite from parsing ON CONFLICT as part of the join
+    statement = f"""
+        INSERT INTO leaderboard (user_id, {columns}, updated_at)
+        SELECT stats.user_id, {columns}, :updated_at
+        FROM ({_leaderboard_stats_sql(user_ids)}) stats
+        WHERE 1 = 1
+        {upsert}
+    """
+    params = {'updated_at': datetime.utcnow()}
+    statement = db.text(statement)
+    if user_ids is not None:
+        statement = statement.bindparams(db.bindparam('user_ids', expanding=True))
+        params['user_ids'] = list(user_ids)
+    result = db.session.execute(statement, params)
+    bump_leaderboard_version()
+    return result.rowcount
+
+def find_drifted_users(user_ids):
+    """Users among ``user_ids`` whose leaderboard row disagrees with the source tables.
+
+    Read-only counterpart of ``rebuild_leaderboard``: the same aggregate,
+    compared with the stored rows. Averages get a small tolerance since the
+    incremental running average accumulates rounding.
+    """
+    statement = db.text(f"""
+        SELECT stats.user_id
+        FROM ({_leaderboard_stats_sql(user_ids)}) stats
+        LEFT JOIN leaderboard l ON l.user_id = stats.user_id
+        WHERE l.user_id IS NULL
+           OR l.total_points <> stats.total_points
+           OR l.quizzes_completed <> stats.quizzes_completed
+           OR l.notes_uploaded <> stats.notes_uploaded
+           OR ABS(l.average_score - stats.average_score) > 0.01
+    """).bindparams(db.bindparam('user_ids', expanding=True))
+    return [user_id for (user_id,) in db.session.execute(statement, {'user_ids': list(user_ids)})]
+
+def rebuild_subject_leaderboard():
+    """Rebuild the per-subject aggregates from quiz_attempts joined to quizzes.
+
+    Only needed to backfill existing data; new attempts keep the table current.
+    The caller commits.
+    """
+    upsert = _upsert_clause(
+        _dialect_name(),
+        ('subject', 'user_id'),
+        ('attempts', 'average_score', 'total_points', 'updated_at')
+    )
+    statement = f"""
+        INSERT INTO subject_leaderboard (subject, user_id, attempts, average_score, total_points, updated_at)
+        SELECT q.subject, a.user_id,
+               COUNT(*),
+               AVG(a.score * 100.0 / a.total_questions),
+               SUM(a.score) * :points_per_correct_answer,
+               :updated_at
+        FROM quiz_attempts a
+        JOIN quizzes q ON q.id = a.quiz_id
+        WHERE 1 = 1
+        GROUP BY q.subject, a.user_id
+        {upsert}
+    """
+    result = db.session.execute(db.text(statement), {
+        'points_per_correct_answer': POINTS_PER_CORRECT_ANSWER,
+        'updated_at': datetime.utcnow()
+    })
+    return result.rowcount
 
 @leaderboard_bp.route('/', methods=['GET'])
 @limiter.limit("100 per hour")
@@ -69,30 +316,59 @@ def get_leaderboard():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        include_total = include_total_requested(default=cursor is None)
+        
+        # Cursor mode: seek past the previous page in rank order. Ranks are
+        # continued from the rank carried in the cursor, since a window would
+        # only see this page.
+        if cursor is not None:
+            leaderboard = keyset_paginate(
+                Leaderboard.query.options(db.joinedload(Leaderboard.user)),
+                ranking_columns(), cursor, per_page, include_total,
+                rank_by=ranking_columns()[:3]
+            )
+            return jsonify({
+                'leaderboard': [entry.to_dict(rank=rank) for entry, rank in leaderboard.items],
+                'next_cursor': leaderboard.next_cursor,
+                'total': leaderboard.total,
+                'per_page': per_page,
+                'updated_at': leaderboard_cache.updated_at_iso()
+            }), 200
+        
+        # Serve unchanged pages from the versioned cache
+        version = leaderboard_cache.current_version()
+        etag = leaderboard_cache.etag(version, page, per_page, int(include_total))
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        payload = leaderboard_cache.get(version, ('page', page, per_page, include_total))
+        if payload is None:
+            # Get leaderboard with pagination
+            leaderboard = db.session.query(Leaderboard, rank_window())\
+                .options(db.joinedload(Leaderboard.user))\
+                .order_by(*ranking_order())\
+                .paginate(page=page, per_page=per_page, error_out=False, count=include_total)
+            
+            payload = {
+                'leaderboard': [entry.to_dict(rank=rank) for entry, rank in leaderboard.items],
+                'total': leaderboard.total,
+                'pages': leaderboard.pages,
+                'current_page': page,
+                'per_page': per_page,
+                'updated_at': leaderboard_cache.updated_at_iso()
+            }
+            leaderboard_cache.set(version, ('page', page, per_page, include_total), payload)
         
-        # Update all user stats first
-        users = User.query.all()
-        for user in users:
-            update_user_leaderboard_stats(user.id)
-        
-        # Update ranks
-        update_all_ranks()
-        
-        # Get leaderboard with pagination
-        leaderboard = Leaderboard.query.order_by(
-            Leaderboard.rank.asc()
-        ).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        return jsonify({
-            'leaderboard': [entry.to_dict() for entry in leaderboard.items],
-            'total': leaderboard.total,
-            'pages': leaderboard.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        response = jsonify(payload)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response, 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get leaderboard', 'details': str(e)}), 500
 
@@ -103,44 +379,77 @@ def get_top_users(limit):
         # Limit the number of top users (max 50)
         limit = min(limit, 50)
         
-        # Update all user stats first
-        users = User.query.all()
-        for user in users:
-            update_user_leaderboard_stats(user.id)
-        
-        # Update ranks
-        update_all_ranks()
-        
-        # Get top users
-        top_users = Leaderboard.query.order_by(
-            Leaderboard.rank.asc()
-        ).limit(limit).all()
+        # Get top users from the rank index, or from SQL until it is loaded
+        if rank_index.loaded:
+            top_user_ids = rank_index.top(limit)
+            ranks = rank_index.ranks_for(top_user_ids)
+            top_users = [(entry, ranks.get(entry.user_id)) for entry in get_entries(top_user_ids)]
+        else:
+            top_users = db.session.query(Leaderboard, rank_window())\
+                .options(db.joinedload(Leaderboard.user))\
+                .order_by(*ranking_order())\
+                .limit(limit).all()
         
         return jsonify({
-            'top_users': [entry.to_dict() for entry in top_users],
-            'count': len(top_users)
+            'top_users': [entry.to_dict(rank=rank) for entry, rank in top_users],
+            'count': len(top_users),
+            'updated_at': leaderboard_cache.updated_at_iso()
         }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get top users', 'details': str(e)}), 500
 
-@leaderboard_bp.route('/user/<int:user_id>', methods=['GET'])
+@leaderboard_bp.route('/weekly', methods=['GET'])
 @limiter.limit("100 per hour")
-def get_user_rank(user_id):
+def get_weekly_leaderboard():
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        
+        return jsonify(get_window_leaderboard(7, page, per_page)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get weekly leaderboard', 'details': str(e)}), 500
+
+@leaderboard_bp.route('/monthly', methods=['GET'])
+@limiter.limit("100 per hour")
+def get_monthly_leaderboard():
     try:
-        # Update user stats
-        update_user_leaderboard_stats(user_id)
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        
+        return jsonify(get_window_leaderboard(30, page, per_page)), 200
         
-        # Update all ranks
-        update_all_ranks()
+    except Exception as e:
+        return jsonify({'error': 'Failed to get monthly leaderboard', 'details': str(e)}), 500
+
+@leaderboard_bp.route('/window/<int:days>', methods=['GET'])
+@limiter.limit("100 per hour")
+def get_window_leaderboard_route(days):
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
         
+        if days < 1 or days > MAX_WINDOW_DAYS:
+            return jsonify({'error': f'days must be between 1 and {MAX_WINDOW_DAYS}'}), 400
+        
+        return jsonify(get_window_leaderboard(days, page, per_page)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get leaderboard window', 'details': str(e)}), 500
+
+@leaderboard_bp.route('/user/<int:user_id>', methods=['GET'])
+@limiter.limit("100 per hour")
+def get_user_rank(user_id):
+    try:
         # Get user's leaderboard entry
-        entry = Leaderboard.query.filter_by(user_id=user_id).first()
+        ranked = get_indexed_entry(user_id)
         
-        if not entry:
+        if not ranked:
             return jsonify({'error': 'User not found in leaderboard'}), 404
         
-        return jsonify({'user_rank': entry.to_dict()}), 200
+        entry, rank = ranked
+        return jsonify({'user_rank': entry.to_dict(rank=rank)}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user rank', 'details': str(e)}), 500
@@ -152,29 +461,27 @@ def get_my_rank():
     try:
         user_id = int(get_jwt_identity())
         
-        # Update user stats
-        update_user_leaderboard_stats(user_id)
-        
-        # Update all ranks
-        update_all_ranks()
-        
         # Get user's leaderboard entry
-        entry = Leaderboard.query.filter_by(user_id=user_id).first()
+        ranked = get_indexed_entry(user_id)
         
-        if not entry:
+        if not ranked:
             return jsonify({'error': 'User not found in leaderboard'}), 404
         
-        # Get users around current user's rank
-        current_rank = entry.rank
+        entry, rank = ranked
         
-        # Get 2 users above and 2 users below
-        nearby_users = Leaderboard.query.filter(
-            Leaderboard.rank.between(max(1, current_rank - 2), current_rank + 2)
-        ).order_by(Leaderboard.rank.asc()).all()
+        # Get 2 users above and 2 users below from the rank index, or from
+        # SQL until it is loaded
+        if rank_index.loaded:
+            nearby_user_ids = rank_index.neighbors(user_id, above=2, below=2)
+            ranks = rank_index.ranks_for(nearby_user_ids)
+            nearby_users = [(user, ranks.get(user.user_id)) for user in get_entries(nearby_user_ids)]
+        else:
+            nearby_users = get_ranked_neighbors(entry, rank, above=2, below=2)
         
         return jsonify({
-            'my_rank': entry.to_dict(),
-            'nearby_users': [user.to_dict() for user in nearby_users]
+            'my_rank': entry.to_dict(rank=rank),
+            'nearby_users': [user.to_dict(rank=user_rank) for user, user_rank in nearby_users],
+            'updated_at': leaderboard_cache.updated_at_iso()
         }), 200
         
     except Exception as e:
@@ -183,11 +490,6 @@ def get_my_rank():
 @leaderboard_bp.route('/stats', methods=['GET'])
 def get_leaderboard_stats():
     try:
-        # Update all user stats
-        users = User.query.all()
-        for user in users:
-            update_user_leaderboard_stats(user.id)
-        
         # Get general stats
         total_users = User.query.count()
         total_points_awarded = db.session.query(func.sum(User.points)).scalar() or 0
@@ -201,15 +503,17 @@ def get_leaderboard_stats():
         ).scalar() or 0
         
         # Get top performers
-        top_scorer = Leaderboard.query.order_by(
+        ranked_entries = db.session.query(Leaderboard, rank_column())
+        
+        top_scorer = ranked_entries.order_by(
             desc(Leaderboard.total_points)
         ).first()
         
-        most_active_quiz_taker = Leaderboard.query.order_by(
+        most_active_quiz_taker = ranked_entries.order_by(
             desc(Leaderboard.quizzes_completed)
         ).first()
         
-        most_active_note_uploader = Leaderboard.query.order_by(
+        most_active_note_uploader = ranked_entries.order_by(
             desc(Leaderboard.notes_uploaded)
         ).first()
         
@@ -223,9 +527,9 @@ def get_leaderboard_stats():
                 'average_quiz_score': round(avg_quiz_score, 2)
             },
             'top_performers': {
-                'highest_points': top_scorer.to_dict() if top_scorer else None,
-                'most_quizzes': most_active_quiz_taker.to_dict() if most_active_quiz_taker else None,
-                'most_notes': most_active_note_uploader.to_dict() if most_active_note_uploader else None
+                'highest_points': top_scorer[0].to_dict(rank=top_scorer[1]) if top_scorer else None,
+                'most_quizzes': most_active_quiz_taker[0].to_dict(rank=most_active_quiz_taker[1]) if most_active_quiz_taker else None,
+                'most_notes': most_active_note_uploader[0].to_dict(rank=most_active_note_uploader[1]) if most_active_note_uploader else None
             }
         }), 200
         
@@ -236,17 +540,36 @@ def get_leaderboard_stats():
 @jwt_required()
 def refresh_leaderboard():
     try:
-        # Update all user stats
-        users = User.query.all()
-        for user in users:
-            update_user_leaderboard_stats(user.id)
-        
-        # Update ranks
-        update_all_ranks()
-        
-        return jsonify({'message': 'Leaderboard refreshed successfully'}), 200
+        # "bulk" rebuilds everything in one statement; "async" queues every
+        # user for the background scheduler; "per-user" is the original
+        # row-by-row recompute, kept for comparison and debugging
+        mode = request.args.get('mode', 'bulk')
+        
+        if mode == 'async':
+            leaderboard_scheduler.mark_dirty(user_id for (user_id,) in db.session.query(User.id))
+            return jsonify({
+                'message': 'Leaderboard refresh scheduled',
+                'mode': mode,
+                'pending_users': leaderboard_scheduler.pending()
+            }), 202
+        elif mode == 'bulk':
+            rebuild_leaderboard()
+            rebuild_subject_leaderboard()
+            db.session.commit()
+        elif mode == 'per-user':
+            users = User.query.all()
+            for user in users:
+                update_user_leaderboard_stats(user.id)
+        else:
+            return jsonify({'error': "mode must be 'bulk', 'async' or 'per-user'"}), 400
+        
+        rank_index.invalidate()
+        leaderboard_cache.invalidate()
+        
+        return jsonify({'message': 'Leaderboard refreshed successfully', 'mode': mode}), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to refresh leaderboard', 'details': str(e)}), 500
 
 @leaderboard_bp.route('/subject/<subject>', methods=['GET'])
@@ -255,19 +578,33 @@ def get_subject_leaderboard(subject):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # Get users with quiz attempts in the specific subject
-        # This is a more complex query that would need to join with Quiz table
-        # For now, we'll return the general leaderboard with a note
-        
-        # In a full implementation, you would:
-        # 1. Join QuizAttempt with Quiz on quiz_id
-        # 2. Filter by Quiz.subject
-        # 3. Calculate subject-specific stats
+        # Read the precomputed (subject, user) aggregates; this is an index
+        # range scan on ix_subject_leaderboard_ranking, not a join over attempts
+        subject_rank = func.rank().over(order_by=(
+            desc(SubjectLeaderboard.total_points),
+            desc(SubjectLeaderboard.average_score),
+            desc(SubjectLeaderboard.attempts)
+        )).label('rank')
+        
+        leaderboard = db.session.query(SubjectLeaderboard, subject_rank)\
+            .options(db.joinedload(SubjectLeaderboard.user))\
+            .filter(SubjectLeaderboard.subject == subject)\
+            .order_by(
+                desc(SubjectLeaderboard.total_points),
+                desc(SubjectLeaderboard.average_score),
+                desc(SubjectLeaderboard.attempts),
+                desc(SubjectLeaderboard.user_id)
+            )\
+            .paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
-            'message': f'Subject-specific leaderboard for {subject} not yet implemented',
-            'suggestion': 'Use general leaderboard endpoint for now'
-        }), 501  # Not Implemented
+            'subject': subject,
+            'leaderboard': [entry.to_dict(rank=rank) for entry, rank in leaderboard.items],
+            'total': leaderboard.total,
+            'pages': leaderboard.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get subject leaderboard', 'details': str(e)}), 500
\ No newline at end of file
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Note, User, db
-from utils import format_response, format_error
+from models import Note, db
+from activity import record_note_created, record_note_deleted
+from utils import format_response, format_error, keyset_paginate, include_total_requested
 from security import limiter, require_json, validate_request_data, InputValidator, log_security_event, InputSanitizer
 from datetime import datetime
 
@@ -17,6 +18,8 @@ def get_notes():
         per_page = request.args.get('per_page', 10, type=int)
         subject = request.args.get('subject')
         search = request.args.get('search')
+        cursor = request.args.get('cursor')
+        include_total = include_total_requested(default=cursor is None)
         
         # Build query
         query = Note.query.filter_by(user_id=user_id)
@@ -32,12 +35,22 @@ def get_notes():
                 )
             )
         
+        # Cursor mode: seek past the previous page (newest first)
+        if cursor is not None:
+            notes = keyset_paginate(query, (Note.created_at, Note.id), cursor, per_page, include_total)
+            return jsonify({
+                'notes': [note.to_dict() for note in notes.items],
+                'next_cursor': notes.next_cursor,
+                'total': notes.total,
+                'per_page': per_page
+            }), 200
+        
         # Order by creation date (newest first)
-        query = query.order_by(Note.created_at.desc())
+        query = query.order_by(Note.created_at.desc(), Note.id.desc())
         
         # Paginate
         notes = query.paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=include_total
         )
         
         return jsonify({
@@ -48,6 +61,8 @@ def get_notes():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get notes', 'details': str(e)}), 500
 
@@ -101,6 +116,9 @@ def create_note():
         )
         
         db.session.add(note)
+        
+        # Award points for creating a note and update the leaderboard row
+        record_note_created(user_id)
         db.session.commit()
         
         # Log note creation
@@ -111,12 +129,6 @@ def create_note():
             'is_public': is_public
         })
         
-        # Award points for creating a note
-        user = User.query.get(user_id)
-        if user:
-            user.points += 10  # 10 points for creating a note
-            db.session.commit()
-        
         return jsonify({
             'message': 'Note created successfully',
             'note': note.to_dict()
@@ -186,6 +198,7 @@ def delete_note(note_id):
             return jsonify({'error': 'Note not found'}), 404
         
         db.session.delete(note)
+        record_note_deleted(user_id, note.created_at)
         db.session.commit()
         
         return jsonify({'message': 'Note deleted successfully'}), 200
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import PastQuestion, User, db
+from models import PastQuestion, db
+from activity import record_past_question_uploaded, record_past_question_deleted
 from datetime import datetime
 from security import limiter, require_json, validate_request_data, InputValidator, log_security_event
+from utils import keyset_paginate, include_total_requested
 
 past_questions_bp = Blueprint('past_questions', __name__)
 
@@ -16,6 +18,8 @@ def get_past_questions():
         exam_type = request.args.get('exam_type')
         year = request.args.get('year', type=int)
         search = request.args.get('search')
+        cursor = request.args.get('cursor')
+        include_total = include_total_requested(default=cursor is None)
         
         # Build query
         query = PastQuestion.query
@@ -38,15 +42,30 @@ def get_past_questions():
                 )
             )
         
+        # Cursor mode: seek past the previous page in listing order
+        if cursor is not None:
+            past_questions = keyset_paginate(
+                query,
+                (PastQuestion.year, PastQuestion.download_count, PastQuestion.id),
+                cursor, per_page, include_total
+            )
+            return jsonify({
+                'past_questions': [pq.to_dict() for pq in past_questions.items],
+                'next_cursor': past_questions.next_cursor,
+                'total': past_questions.total,
+                'per_page': per_page
+            }), 200
+        
         # Order by year (newest first), then by download count
         query = query.order_by(
             PastQuestion.year.desc(),
-            PastQuestion.download_count.desc()
+            PastQuestion.download_count.desc(),
+            PastQuestion.id.desc()
         )
         
         # Paginate
         past_questions = query.paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=include_total
         )
         
         return jsonify({
@@ -57,6 +76,8 @@ def get_past_questions():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get past questions', 'details': str(e)}), 500
 
@@ -127,13 +148,10 @@ def upload_past_question():
         )
         
         db.session.add(past_question)
-        db.session.commit()
         
         # Award points for uploading past question
-        user = User.query.get(user_id)
-        if user:
-            user.points += 25  # 25 points for uploading past question
-            db.session.commit()
+        record_past_question_uploaded(user_id)
+        db.session.commit()
         
         # Log successful upload
         log_security_event('past_question_uploaded', {
@@ -214,6 +232,7 @@ def delete_past_question(question_id):
             return jsonify({'error': 'Past question not found or not authorized'}), 404
         
         db.session.delete(past_question)
+        record_past_question_deleted(user_id)
         db.session.commit()
         
         return jsonify({'message': 'Past question deleted successfully'}), 200
@@ -1,49 +1,65 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Quiz, QuizAttempt, User, Note, db
-from transformers import pipeline
+from models import Quiz, QuizAttempt, QuizGenerationJob, Note, db
+from activity import record_quiz_generated, record_quiz_attempt
+from model_registry import model_registry
+from quiz_jobs import quiz_job_workers
+from question_cache import question_cache
 from security import limiter, require_json, validate_request_data, InputValidator, log_security_event
+from utils import keyset_paginate, include_total_requested
 import json
 import re
 import random
 
 quiz_bp = Blueprint('quiz', __name__)
 
-# Initialize Hugging Face question generation pipeline
-try:
-    # Use a lightweight model for question generation
-    question_generator = pipeline(
-        "text2text-generation",
-        model="valhalla/t5-small-qg-hl",
-        tokenizer="valhalla/t5-small-qg-hl"
-    )
-except Exception as e:
-    print(f"Warning: Could not load question generation model: {e}")
-    question_generator = None
+def generate_questions_from_text(text, num_questions=5, batch_size=None, difficulty='medium', use_cache=True):
+    """Generate questions from text using Hugging Face model
 
-def generate_questions_from_text(text, num_questions=5):
-    """Generate questions from text using Hugging Face model"""
+    Every candidate sentence goes through the pipeline in one call, in padded
+    batches of ``batch_size`` (default ``QUESTION_GENERATION_BATCH_SIZE``).
+    Model output is cached by content hash and checked before the model is
+    loaded, so regenerating from the same text never touches the model;
+    fallback questions are never cached.
+    """
+    # The version comes from the registered spec; no model load needed
+    model_version = model_registry.version('question_generation')
+    if use_cache:
+        cached = question_cache.get(text, num_questions, difficulty, model_version)
+        if cached is not None:
+            return cached
+    
+    # Loaded on first use, once per process
+    question_generator = model_registry.get('question_generation')
     if not question_generator:
         # Fallback to simple question generation if model is not available
         return generate_fallback_questions(text, num_questions)
     
+    if batch_size is None:
+        batch_size = current_app.config.get('QUESTION_GENERATION_BATCH_SIZE', 8)
+    
     try:
         # Split text into sentences for better question generation
         sentences = re.split(r'[.!?]+', text)
         sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
+        sentences = sentences[:num_questions]
+        
+        if not sentences:
+            return []
+        
+        # Generate all questions in batched calls to the model
+        inputs = [f"generate question: {sentence}" for sentence in sentences]
+        results = question_generator(inputs, max_length=64, num_return_sequences=1, batch_size=batch_size)
         
         questions = []
         
-        for i, sentence in enumerate(sentences[:num_questions]):
-            if len(sentence) < 20:
-                continue
-                
-            # Generate question using the model
-            input_text = f"generate question: {sentence}"
-            result = question_generator(input_text, max_length=64, num_return_sequences=1)
+        for i, (sentence, result) in enumerate(zip(sentences, results)):
+            # One sequence per input; some pipeline versions wrap it in a list
+            if isinstance(result, list):
+                result = result[0] if result else None
             
-            if result and len(result) > 0:
-                question_text = result[0]['generated_text'].strip()
+            if result:
+                question_text = result['generated_text'].strip()
                 
                 # Generate multiple choice options
                 options = generate_options_for_question(sentence, question_text)
@@ -60,6 +76,8 @@ def generate_questions_from_text(text, num_questions=5):
                 if len(questions) >= num_questions:
                     break
         
+        if use_cache:
+            question_cache.set(text, num_questions, difficulty, model_version, questions)
         return questions
         
     except Exception as e:
@@ -175,8 +193,25 @@ def generate_quiz():
         difficulty = data.get('difficulty', 'medium')
         num_questions = min(int(data.get('num_questions', 5)), 10)  # Max 10 questions
         
+        # Job mode: queue the generation and let the worker pool create the quiz
+        if request.args.get('mode') == 'async':
+            job = quiz_job_workers.enqueue(user_id, content, title, subject, difficulty, num_questions)
+            db.session.commit()
+            
+            log_security_event('quiz_generation_queued', {
+                'user_id': user_id,
+                'job_id': job.id,
+                'num_questions': num_questions
+            })
+            
+            return jsonify({
+                'message': 'Quiz generation queued',
+                'job': job.to_dict(),
+                'status_url': f'/api/quiz/jobs/{job.id}'
+            }), 202
+        
         # Generate questions using AI
-        questions = generate_questions_from_text(content, num_questions)
+        questions = generate_questions_from_text(content, num_questions, difficulty=difficulty)
         
         if not questions:
             return jsonify({'error': 'Could not generate questions from the provided content'}), 400
@@ -191,6 +226,9 @@ def generate_quiz():
         )
         
         db.session.add(quiz)
+        
+        # Award points for creating a quiz
+        record_quiz_generated(user_id)
         db.session.commit()
         
         # Log quiz generation
@@ -200,12 +238,6 @@ def generate_quiz():
             'num_questions': len(questions)
         })
         
-        # Award points for creating a quiz
-        user = User.query.get(user_id)
-        if user:
-            user.points += 20  # 20 points for creating a quiz
-            db.session.commit()
-        
         return jsonify({
             'message': 'Quiz generated successfully',
             'quiz': quiz.to_dict()
@@ -229,8 +261,22 @@ def generate_quiz_from_note(note_id):
         num_questions = min(int(data.get('num_questions', 5)), 10)
         difficulty = data.get('difficulty', 'medium')
         
+        # Job mode: the note's content is copied into the job
+        if request.args.get('mode') == 'async':
+            job = quiz_job_workers.enqueue(
+                user_id, note.content, f"Quiz: {note.title}", note.subject, difficulty, num_questions,
+                note_id=note.id
+            )
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Quiz generation from note queued',
+                'job': job.to_dict(),
+                'status_url': f'/api/quiz/jobs/{job.id}'
+            }), 202
+        
         # Generate questions from note content
-        questions = generate_questions_from_text(note.content, num_questions)
+        questions = generate_questions_from_text(note.content, num_questions, difficulty=difficulty)
         
         if not questions:
             return jsonify({'error': 'Could not generate questions from the note content'}), 400
@@ -245,13 +291,10 @@ def generate_quiz_from_note(note_id):
         )
         
         db.session.add(quiz)
-        db.session.commit()
         
         # Award points
-        user = User.query.get(user_id)
-        if user:
-            user.points += 15  # 15 points for generating quiz from note
-            db.session.commit()
+        record_quiz_generated(user_id, from_note=True)
+        db.session.commit()
         
         return jsonify({
             'message': 'Quiz generated from note successfully',
@@ -262,6 +305,31 @@ def generate_quiz_from_note(note_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to generate quiz from note', 'details': str(e)}), 500
 
+@quiz_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_generation_job(job_id):
+    try:
+        user_id = int(get_jwt_identity())
+        job = QuizGenerationJob.query.filter_by(id=job_id, user_id=user_id).first()
+        
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        response = {'job': job.to_dict()}
+        if job.status == 'succeeded':
+            quiz = db.session.get(Quiz, job.quiz_id)
+            response['quiz'] = quiz.to_dict() if quiz else None
+            return jsonify(response), 200
+        
+        # Still pending: tell pollers when to check again
+        headers = {}
+        if job.status in ('queued', 'running'):
+            headers['Retry-After'] = str(quiz_job_workers.poll_interval)
+        return jsonify(response), 200, headers
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get generation job', 'details': str(e)}), 500
+
 @quiz_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_quizzes():
@@ -271,6 +339,8 @@ def get_quizzes():
         per_page = request.args.get('per_page', 10, type=int)
         subject = request.args.get('subject')
         difficulty = request.args.get('difficulty')
+        cursor = request.args.get('cursor')
+        include_total = include_total_requested(default=cursor is None)
         
         # Build query - get user's own quizzes
         query = Quiz.query.filter_by(created_by=user_id)
@@ -281,12 +351,22 @@ def get_quizzes():
         if difficulty:
             query = query.filter_by(difficulty=difficulty)
         
+        # Cursor mode: seek past the previous page (newest first)
+        if cursor is not None:
+            quizzes = keyset_paginate(query, (Quiz.created_at, Quiz.id), cursor, per_page, include_total)
+            return jsonify({
+                'quizzes': [quiz.to_dict() for quiz in quizzes.items],
+                'next_cursor': quizzes.next_cursor,
+                'total': quizzes.total,
+                'per_page': per_page
+            }), 200
+        
         # Order by creation date (newest first)
-        query = query.order_by(Quiz.created_at.desc())
+        query = query.order_by(Quiz.created_at.desc(), Quiz.id.desc())
         
         # Paginate
         quizzes = query.paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=include_total
         )
         
         return jsonify({
@@ -297,6 +377,8 @@ def get_quizzes():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get quizzes', 'details': str(e)}), 500
 
@@ -360,11 +442,8 @@ def submit_quiz_attempt(quiz_id):
         
         db.session.add(attempt)
         
-        # Award points based on score
-        user = User.query.get(user_id)
-        if user:
-            points_earned = score * 5  # 5 points per correct answer
-            user.points += points_earned
+        # Award points based on score and update the leaderboard row
+        points_earned = record_quiz_attempt(user_id, score, total_questions, subject=quiz.subject)
         
         db.session.commit()
         
@@ -379,7 +458,7 @@ def submit_quiz_attempt(quiz_id):
         return jsonify({
             'message': 'Quiz attempt submitted successfully',
             'attempt': attempt.to_dict(),
-            'points_earned': score * 5
+            'points_earned': points_earned
         }), 201
         
     except Exception as e:
@@ -393,11 +472,27 @@ def get_quiz_attempts():
         user_id = int(get_jwt_identity())
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        include_total = include_total_requested(default=cursor is None)
+        
+        query = QuizAttempt.query.filter_by(user_id=user_id)
+        
+        # Cursor mode: seek past the previous page (most recent first)
+        if cursor is not None:
+            attempts = keyset_paginate(
+                query, (QuizAttempt.completed_at, QuizAttempt.id), cursor, per_page, include_total
+            )
+            return jsonify({
+                'attempts': [attempt.to_dict() for attempt in attempts.items],
+                'next_cursor': attempts.next_cursor,
+                'total': attempts.total,
+                'per_page': per_page
+            }), 200
         
         # Get user's quiz attempts
-        attempts = QuizAttempt.query.filter_by(user_id=user_id)\
-            .order_by(QuizAttempt.completed_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        attempts = query\
+            .order_by(QuizAttempt.completed_at.desc(), QuizAttempt.id.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False, count=include_total)
         
         return jsonify({
             'attempts': [attempt.to_dict() for attempt in attempts.items],
@@ -407,5 +502,7 @@ def get_quiz_attempts():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get quiz attempts', 'details': str(e)}), 500
\ No newline at end of file
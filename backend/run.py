@@ -5,7 +5,7 @@ This script starts the development server.
 """
 
 import os
-from app import create_app
+from app import create_app, start_background_workers
 from config import config
 
 # Get configuration from environment variable or default to development
@@ -20,6 +20,10 @@ if __name__ == '__main__':
     port = int(os.environ.get('FLASK_PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # With the debug reloader only the child process serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers(app)
+    
     print(f"Starting EduAccess backend server...")
     print(f"Environment: {config_name}")
     print(f"Server: http://{host}:{port}")
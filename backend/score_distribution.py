@@ -0,0 +1,206 @@
+"""
+Mergeable distributions of users' average quiz scores for percentile ranks.
+
+Averages are bounded, so each distribution is a fixed histogram of one-point
+bins (0-100) holding one count per user. Histograms merge by adding bin
+counts, which makes them cheap to update per attempt, to combine across
+worker processes and to persist with atomic ``count = count + n`` upserts.
+One distribution covers every user's overall average and one per quiz
+subject covers the users' averages in that subject.
+
+Each submitted attempt moves the user from the bin of their previous
+average to the bin of the new one. Moves are applied to the in-process
+histograms after commit and queued as pending bin deltas. A daemon thread flushes the deltas to
+``score_distribution_bins`` every ``sync_interval`` seconds and reloads the
+merged totals, which also picks up attempts recorded by other processes.
+Percentile lookups read cached suffix sums and take constant time.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from models import db, ScoreDistributionBin
+
+logger = logging.getLogger(__name__)
+
+BIN_COUNT = 101
+GLOBAL_SCOPE = '*'
+
+def score_bin(percentage):
+    """Histogram bin for a quiz percentage.
+
+    Rounds first so averages recomputed in floating point land in the same bin.
+    """
+    return min(BIN_COUNT - 1, max(0, int(round(percentage, 6))))
+
+class ScoreHistogram:
+    """Counts of quiz percentages in one-point bins."""
+
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts else [0] * BIN_COUNT
+        self._at_or_above = None
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def add(self, percentage, count=1):
+        self.counts[score_bin(percentage)] += count
+        self._at_or_above = None
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self._at_or_above = None
+        return self
+
+    def top_fraction(self, percentage):
+        """Share of scores at or above ``percentage``'s bin, or None when empty."""
+        if self._at_or_above is None:
+            at_or_above = [0] * (BIN_COUNT + 1)
+            for i in range(BIN_COUNT - 1, -1, -1):
+                at_or_above[i] = at_or_above[i + 1] + self.counts[i]
+            self._at_or_above = at_or_above
+        total = self._at_or_above[0]
+        if not total:
+            return None
+        return self._at_or_above[score_bin(percentage)] / total
+
+class ScoreDistributions:
+    """Global and per-subject histograms of user averages, synced with the database."""
+
+    def __init__(self, sync_interval=60):
+        self.sync_interval = sync_interval
+        self._histograms = {}
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def move(self, scope, old_average, new_average):
+        """Move one user's count from ``old_average``'s bin (None for a new user) to ``new_average``'s."""
+        deltas = defaultdict(int)
+        if old_average is not None:
+            deltas[score_bin(old_average)] -= 1
+        deltas[score_bin(new_average)] += 1
+        with self._lock:
+            histogram = self._histograms.setdefault(scope, ScoreHistogram())
+            for bin_, count in deltas.items():
+                if count:
+                    histogram.add(bin_, count)
+                    self._pending[scope][bin_] += count
+
+    def top_percent(self, percentage, subject=None):
+        """Percentage of users whose average falls in ``percentage``'s bin or higher.
+
+        Looks in the subject's distribution when ``subject`` is given, else in
+        the global one. Returns None when there is no data.
+        """
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            histogram = self._histograms.get(subject if subject is not None else GLOBAL_SCOPE)
+            fraction = histogram.top_fraction(percentage) if histogram else None
+        return round(fraction * 100, 1) if fraction is not None else None
+
+    def load(self):
+        """Replace the histograms with the persisted totals plus unflushed deltas."""
+        histograms = {}
+        for scope, bin_, count in db.session.query(
+            ScoreDistributionBin.scope, ScoreDistributionBin.bin, ScoreDistributionBin.count
+        ):
+            histograms.setdefault(scope, ScoreHistogram()).counts[bin_] += count
+        with self._lock:
+            for scope, deltas in self._pending.items():
+                histogram = histograms.setdefault(scope, ScoreHistogram())
+                for bin_, count in deltas.items():
+                    histogram.counts[bin_] += count
+            self._histograms = histograms
+            self._loaded = True
+
+    def sync(self):
+        """Flush pending deltas to the database and reload. Returns the bins written."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+        rows = [
+            {'scope': scope, 'bin': bin_, 'count': count}
+            for scope, deltas in pending.items()
+            for bin_, count in deltas.items()
+        ]
+        if rows:
+            if db.engine.dialect.name == 'mysql':
+                upsert = 'ON DUPLICATE KEY UPDATE count = count + VALUES(count)'
+            else:
+                upsert = ('ON CONFLICT (scope, bin) '
+                          'DO UPDATE SET count = score_distribution_bins.count + excluded.count')
+            try:
+                db.session.execute(db.text(f"""
+                    INSERT INTO score_distribution_bins (scope, bin, count)
+                    VALUES (:scope, :bin, :count)
+                    {upsert}
+                """), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    for row in rows:
+                        self._pending[row['scope']][row['bin']] += row['count']
+                raise
+        self.load()
+        return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {}
+            self._pending = defaultdict(lambda: defaultdict(int))
+            self._loaded = False
+
+    def start(self, app):
+        """Start the background sync thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name='score-distribution-sync', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app):
+        while not self._stop.wait(self.sync_interval):
+            with app.app_context():
+                try:
+                    self.sync()
+                except Exception:
+                    logger.exception('Score distribution sync failed')
+                finally:
+                    db.session.remove()
+
+score_distributions = ScoreDistributions()
+
+def note_average_moved(scope, old_average, new_average):
+    """Queue a move of a user's average in ``scope``'s distribution for when the transaction commits."""
+    db.session.info.setdefault('score_distribution_moves', []).append((scope, old_average, new_average))
+
+def _apply_moves(session):
+    for scope, old_average, new_average in session.info.pop('score_distribution_moves', ()):
+        score_distributions.move(scope, old_average, new_average)
+
+def _discard_moves(session, previous_transaction):
+    session.info.pop('score_distribution_moves', None)
+
+def init_score_distributions(app):
+    """Configure the distributions and hook them to commits.
+
+    The sync thread is started by ``app.start_background_workers``.
+    """
+    score_distributions.sync_interval = app.config.get('SCORE_DISTRIBUTION_SYNC_INTERVAL', 60)
+    if not event.contains(db.session, 'after_commit', _apply_moves):
+        event.listen(db.session, 'after_commit', _apply_moves)
+        event.listen(db.session, 'after_soft_rollback', _discard_moves)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for dashboard endpoints.
+
+Unlike the *_api.py scripts these run in-process against an in-memory
+database, so they can be run with pytest without a live server:
+
+    pytest test_dashboard_queries.py
+"""
+
+import pytest
+
+from app import create_app
+import achievements
+from models import db, UserAchievement
+from counters import counters_cache
+from query_counter import StatementCounter
+from security import limiter
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    limiter.enabled = False
+    counters_cache.clear()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    limiter.enabled = True
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post('/api/auth/register', json={
+        'username': 'dashboard_user',
+        'email': 'dashboard_user@example.com',
+        'password': 'Passw0rd!123',
+        'first_name': 'Dash',
+        'last_name': 'Board'
+    })
+    assert response.status_code == 201, response.get_json()
+    headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    for subject in ('Mathematics', 'Physics'):
+        response = client.post('/api/notes/', headers=headers, json={
+            'title': f'{subject} notes',
+            'content': 'Lecture notes long enough to pass validation.',
+            'subject': subject
+        })
+        assert response.status_code == 201, response.get_json()
+    return headers
+
+def test_overview_is_a_single_statement(client, auth_headers):
+    with StatementCounter(db.engine) as counter:
+        response = client.get('/api/dashboard/overview', headers=auth_headers)
+
+    assert response.status_code == 200, response.get_json()
+    assert len(counter.statements) == 1, counter.statements
+
+    data = response.get_json()
+    assert data['user_info']['username'] == 'dashboard_user'
+    assert data['user_info']['points'] == 20
+    assert data['user_info']['rank'] == 1
+    assert data['user_info']['total_users'] == 1
+    assert data['stats']['total_notes'] == 2
+    assert data['stats']['total_quiz_attempts'] == 0
+    assert data['stats']['average_quiz_score'] == 0.0
+    assert data['recent_activity']['notes_this_week'] == 2
+
+def test_achievements_are_awarded_on_write_and_read_in_one_statement(client, auth_headers):
+    for i in range(8):
+        response = client.post('/api/notes/', headers=auth_headers, json={
+            'title': f'Chemistry notes {i}',
+            'content': 'Lecture notes long enough to pass validation.',
+            'subject': 'Chemistry'
+        })
+        assert response.status_code == 201, response.get_json()
+
+    with StatementCounter(db.engine) as counter:
+        response = client.get('/api/dashboard/achievements', headers=auth_headers)
+
+    assert response.status_code == 200, response.get_json()
+    assert len(counter.statements) == 1, counter.statements
+
+    data = response.get_json()
+    assert [a['key'] for a in data['achievements']] == ['note_taker']
+    assert data['total_earned'] == 1
+
+def test_awarding_a_badge_another_commit_already_stored_keeps_the_write(client, auth_headers, monkeypatch):
+    for i in range(7):
+        response = client.post('/api/notes/', headers=auth_headers, json={
+            'title': f'Chemistry notes {i}',
+            'content': 'Lecture notes long enough to pass validation.',
+            'subject': 'Chemistry'
+        })
+        assert response.status_code == 201, response.get_json()
+
+    # A concurrent commit stored the badge after this one checked for it
+    db.session.add(UserAchievement(user_id=1, achievement_key='note_taker'))
+    db.session.commit()
+    monkeypatch.setattr(achievements, '_earned_keys', lambda user_id: set())
+
+    response = client.post('/api/notes/', headers=auth_headers, json={
+        'title': 'Chemistry notes 7',
+        'content': 'Lecture notes long enough to pass validation.',
+        'subject': 'Chemistry'
+    })
+
+    assert response.status_code == 201, response.get_json()
+    assert UserAchievement.query.filter_by(user_id=1).count() == 1
+
+def test_counters_are_cached_until_the_next_write(client, auth_headers):
+    first = client.get('/api/dashboard/overview', headers=auth_headers)
+    assert first.status_code == 200, first.get_json()
+
+    with StatementCounter(db.engine) as counter:
+        second = client.get('/api/dashboard/overview', headers=auth_headers)
+
+    assert counter.statements == []
+    assert second.get_json() == first.get_json()
+
+    response = client.post('/api/notes/', headers=auth_headers, json={
+        'title': 'Biology notes',
+        'content': 'Lecture notes long enough to pass validation.',
+        'subject': 'Biology'
+    })
+    assert response.status_code == 201, response.get_json()
+
+    data = client.get('/api/dashboard/overview', headers=auth_headers).get_json()
+    assert data['stats']['total_notes'] == 3
+    assert data['user_info']['points'] == 30
@@ -134,11 +134,12 @@ def test_leaderboard_endpoints(token):
     else:
         print(f"❌ Failed to refresh leaderboard: {response.status_code if response else 'No response'}")
     
-    # Test subject-specific leaderboard (should return not implemented)
-    print("\n--- Testing GET /leaderboard/subject/mathematics ---")
-    response = make_request('GET', f"{BASE_URL}/leaderboard/subject/mathematics", headers=headers)
-    if response and response.status_code == 501:
-        print("✅ Subject leaderboard correctly returns 'Not Implemented'")
+    # Test subject-specific leaderboard
+    print("\n--- Testing GET /leaderboard/subject/Mathematics ---")
+    response = make_request('GET', f"{BASE_URL}/leaderboard/subject/Mathematics", headers=headers)
+    if response and response.status_code == 200:
+        data = response.json()
+        print(f"✅ Subject leaderboard retrieved: {len(data.get('leaderboard', []))} entries")
     else:
         print(f"❌ Unexpected response for subject leaderboard: {response.status_code if response else 'No response'}")
 
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the database-backed quiz generation queue.
+
+Jobs are claimed and run synchronously against an in-memory database, with
+question generation replaced by a stub so no model is loaded:
+
+    pytest test_quiz_jobs.py
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import routes.quiz
+from app import create_app
+from config import config, TestingConfig
+from models import db, User, Quiz, QuizGenerationJob
+from quiz_jobs import QuizJobWorkers
+
+BACKGROUND_THREADS = {'leaderboard-scheduler', 'score-distribution-sync', 'model-warmup'}
+
+QUESTIONS = [{
+    'id': 1,
+    'question': 'What is the powerhouse of the cell?',
+    'options': ['Mitochondria', 'Nucleus', 'Ribosome', 'None of the above'],
+    'correct_answer': 0,
+    'explanation': 'Based on: The mitochondria is the powerhouse of the cell...'
+}]
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(
+            username='jobuser', email='jobuser@example.com',
+            password_hash='x', first_name='Job', last_name='User'
+        ))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def workers():
+    return QuizJobWorkers(pool_size=0, timeout=300, max_attempts=3)
+
+@pytest.fixture
+def generated(monkeypatch):
+    calls = []
+
+    def generate(text, num_questions=5, difficulty='medium', **kwargs):
+        calls.append((text, num_questions, difficulty))
+        return QUESTIONS
+    monkeypatch.setattr(routes.quiz, 'generate_questions_from_text', generate)
+    return calls
+
+def _enqueue(workers, content='The mitochondria is the powerhouse of the cell.', note_id=None):
+    job = workers.enqueue(1, content, 'Biology quiz', 'Biology', 'hard', 3, note_id=note_id)
+    db.session.commit()
+    return job.id
+
+def test_claim_next_takes_queued_jobs_oldest_first(app, workers):
+    first = _enqueue(workers)
+    second = _enqueue(workers)
+
+    job = workers.claim_next()
+    assert (job.id, job.status, job.attempts) == (first, 'running', 1)
+    assert job.started_at is not None
+    assert workers.claim_next().id == second
+    assert workers.claim_next() is None
+
+def test_claim_next_reclaims_only_stale_running_jobs(app, workers):
+    job_id = _enqueue(workers)
+    assert workers.claim_next().id == job_id
+    assert workers.claim_next() is None
+
+    db.session.get(QuizGenerationJob, job_id).started_at = datetime.utcnow() - timedelta(seconds=301)
+    db.session.commit()
+
+    job = workers.claim_next()
+    assert (job.id, job.status, job.attempts) == (job_id, 'running', 2)
+
+def test_run_job_creates_the_quiz_and_awards_points(app, workers, generated):
+    _enqueue(workers)
+
+    job = workers.run_job(workers.claim_next())
+
+    assert job.status == 'succeeded'
+    assert job.error is None and job.finished_at is not None
+    assert generated == [('The mitochondria is the powerhouse of the cell.', 3, 'hard')]
+    quiz = db.session.get(Quiz, job.quiz_id)
+    assert (quiz.title, quiz.subject, quiz.difficulty, quiz.created_by) == ('Biology quiz', 'Biology', 'hard', 1)
+    assert quiz.questions == QUESTIONS
+    assert db.session.get(User, 1).points == 20
+
+def test_run_job_records_failures(app, workers, monkeypatch):
+    _enqueue(workers)
+    monkeypatch.setattr(routes.quiz, 'generate_questions_from_text', lambda *args, **kwargs: [])
+    job = workers.run_job(workers.claim_next())
+    assert (job.status, job.quiz_id) == ('failed', None)
+    assert 'Could not generate questions' in job.error
+
+    _enqueue(workers)
+
+    def explode(*args, **kwargs):
+        raise RuntimeError('model crashed')
+    monkeypatch.setattr(routes.quiz, 'generate_questions_from_text', explode)
+    job = workers.run_job(workers.claim_next())
+    assert (job.status, job.error) == ('failed', 'model crashed')
+    assert Quiz.query.count() == 0
+    assert db.session.get(User, 1).points == 0
+
+def test_run_job_gives_up_after_max_attempts(app, workers, generated):
+    job_id = _enqueue(workers)
+    db.session.get(QuizGenerationJob, job_id).attempts = workers.max_attempts
+    db.session.commit()
+
+    job = workers.run_job(workers.claim_next())
+
+    assert job.status == 'failed'
+    assert 'repeated worker failures' in job.error
+    assert generated == []
+
+def test_run_pending_drains_the_queue(app, workers, generated):
+    for _ in range(3):
+        _enqueue(workers)
+
+    assert workers.run_pending() == 3
+    assert {job.status for job in QuizGenerationJob.query} == {'succeeded'}
+
+class BackgroundEnabledConfig(TestingConfig):
+    LEADERBOARD_SCHEDULER_ENABLED = True
+    SCORE_DISTRIBUTION_SYNC_ENABLED = True
+    QUIZ_JOB_WORKERS = 2
+    MODEL_WARMUP = 'all'
+
+def test_create_app_starts_no_background_threads(monkeypatch):
+    monkeypatch.setitem(config, 'background', BackgroundEnabledConfig)
+    before = {thread.name for thread in threading.enumerate()}
+    create_app('background')
+    started = {thread.name for thread in threading.enumerate()} - before
+
+    assert not started & BACKGROUND_THREADS
+    assert not any(name.startswith('quiz-job-worker') for name in started)
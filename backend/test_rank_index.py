@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-process leaderboard rank index.
+
+The skiplist and the index are checked against brute-force sorting of the
+same data, and the database-backed parts run against an in-memory database:
+
+    pytest test_rank_index.py
+"""
+
+import random
+import threading
+
+import pytest
+
+from app import create_app
+from models import db, User, Leaderboard
+from rank_index import IndexableSkiplist, RankIndex, sort_key
+
+def test_skiplist_matches_a_sorted_list():
+    rng = random.Random(7)
+    skiplist = IndexableSkiplist(expected_size=64)
+    expected = []
+
+    for _ in range(2000):
+        key = rng.randrange(500)
+        if key in expected and rng.random() < 0.5:
+            skiplist.remove(key)
+            expected.remove(key)
+        elif key not in expected:
+            skiplist.insert(key)
+            expected.append(key)
+            expected.sort()
+
+    assert len(skiplist) == len(expected)
+    assert [skiplist[i] for i in range(len(expected))] == expected
+    assert skiplist.islice(0, len(expected)) == expected
+    assert skiplist.islice(10, 25) == expected[10:25]
+    assert skiplist.islice(-5, 3) == expected[:3]
+    assert skiplist.islice(len(expected) - 2, len(expected) + 10) == expected[-2:]
+    for probe in range(-1, 502):
+        assert skiplist.bisect_left(probe) == sum(1 for key in expected if key < probe)
+
+def test_skiplist_rejects_missing_keys_and_bad_indexes():
+    skiplist = IndexableSkiplist()
+    skiplist.insert(3)
+
+    with pytest.raises(KeyError):
+        skiplist.remove(4)
+    with pytest.raises(IndexError):
+        skiplist[1]
+    assert skiplist.islice(1, 1) == []
+
+def _brute_force_ranks(rows):
+    """RANK() over (total_points, average_score, quizzes_completed) descending."""
+    scores = {row[0]: (row[1], row[2], row[3]) for row in rows}
+    return {
+        user_id: 1 + sum(1 for other in scores.values() if other > score)
+        for user_id, score in scores.items()
+    }
+
+def _ordered_user_ids(rows):
+    return [row[0] for row in sorted(rows, key=lambda row: sort_key(*row))]
+
+def test_rank_index_matches_brute_force_ranking():
+    rng = random.Random(11)
+    rows = [
+        (user_id, rng.choice([0, 10, 20, 30]), rng.choice([0.0, 50.0, 100.0]), rng.randrange(3))
+        for user_id in range(1, 201)
+    ]
+    index = RankIndex()
+    index._load_rows(rows)
+
+    expected_ranks = _brute_force_ranks(rows)
+    ordered = _ordered_user_ids(rows)
+    assert len(index) == len(rows)
+    assert all(index.rank_of(user_id) == rank for user_id, rank in expected_ranks.items())
+    assert index.ranks_for([1, 2, 999]) == {1: expected_ranks[1], 2: expected_ranks[2]}
+    assert index.top(10) == ordered[:10]
+
+    position = ordered.index(50)
+    assert index.neighbors(50, above=2, below=2) == ordered[max(position - 2, 0):position + 3]
+    assert index.rank_of(999) is None
+    assert index.neighbors(999) == []
+
+def test_rank_index_update_and_discard():
+    index = RankIndex()
+    index._load_rows([(1, 10, 0.0, 0), (2, 20, 0.0, 0), (3, 20, 0.0, 0)])
+    assert [index.rank_of(user_id) for user_id in (1, 2, 3)] == [3, 1, 1]
+
+    index.update(1, 30, 0.0, 0)
+    assert [index.rank_of(user_id) for user_id in (1, 2, 3)] == [1, 2, 2]
+    assert index.top(3) == [1, 3, 2]
+
+    index.update(4, 5, 0.0, 0)
+    assert index.rank_of(4) == 4
+
+    index.discard(1)
+    index.discard(1)
+    assert len(index) == 3
+    assert index.rank_of(1) is None
+    assert [index.rank_of(user_id) for user_id in (2, 3, 4)] == [1, 1, 3]
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        for i, points in enumerate((40, 10, 40, 0), start=1):
+            db.session.add(User(
+                username=f'rankuser{i}', email=f'rankuser{i}@example.com',
+                password_hash='x', first_name='Rank', last_name='User'
+            ))
+            db.session.add(Leaderboard(
+                user_id=i, total_points=points, quizzes_completed=0,
+                notes_uploaded=0, average_score=0.0
+            ))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_rank_index_loads_and_verifies_against_the_database(app):
+    index = RankIndex()
+    index.ensure_fresh()
+
+    assert [index.rank_of(user_id) for user_id in (1, 2, 3, 4)] == [1, 3, 1, 4]
+    assert index.verify() == 0
+
+    index.update(2, 50, 0.0, 0)
+    index.discard(4)
+    assert index.verify() == 2
+
+    index.max_age = 0
+    index.loaded_at -= 1
+    index.ensure_fresh()
+    assert index.verify() == 0
+    assert index.rank_of(2) == 3
+
+def test_rank_index_reloads_are_single_flight(app):
+    index = RankIndex()
+    loads = []
+    release = threading.Event()
+    original_load_rows = index._load_rows
+
+    def slow_load_rows(rows):
+        loads.append(threading.current_thread().name)
+        release.wait(5)
+        original_load_rows(rows)
+
+    index._load_rows = slow_load_rows
+    rows = index._fetch_rows()
+    index._fetch_rows = lambda *args, **kwargs: rows
+
+    threads = [threading.Thread(target=index.ensure_fresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(loads) == 1
+    assert index.rank_of(1) == 1
+
+    # A stale index is resynced by one caller while the others keep serving it
+    loads.clear()
+    release.clear()
+    index.max_age = 0
+    index.loaded_at -= 1
+    resync = threading.Thread(target=index.ensure_fresh)
+    resync.start()
+    while not loads:
+        pass
+    index.ensure_fresh()
+    assert index.rank_of(3) == 1
+    release.set()
+    resync.join(5)
+    assert len(loads) == 1
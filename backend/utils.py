@@ -1,9 +1,13 @@
 import os
+import base64
+import json
 import secrets
 import requests
+from datetime import datetime
+from sqlalchemy import DateTime, tuple_
 from werkzeug.utils import secure_filename
-from flask import current_app
-from transformers import pipeline
+from flask import current_app, request
+from model_registry import model_registry
 import logging
 
 # Set up logging
@@ -60,14 +64,11 @@ class HuggingFaceAPI:
     def __init__(self):
         self.api_token = current_app.config.get('HUGGINGFACE_API_TOKEN')
         self.base_url = "https://api-inference.huggingface.co/models"
-        
-        # Initialize local pipeline as fallback
-        try:
-            self.qa_pipeline = pipeline("question-answering", 
-                                      model="distilbert-base-cased-distilled-squad")
-        except Exception as e:
-            logger.warning(f"Could not initialize local QA pipeline: {str(e)}")
-            self.qa_pipeline = None
+    
+    @property
+    def qa_pipeline(self):
+        """Local QA pipeline used as a fallback, shared by every instance in the process."""
+        return model_registry.get('question_answering')
     
     def generate_questions(self, context, num_questions=5):
         """Generate questions from given context using Hugging Face API."""
@@ -231,4 +232,91 @@ def paginate_query(query, page, per_page):
         'pages': (total + per_page - 1) // per_page,
         'has_prev': page > 1,
         'has_next': page * per_page < total
-    }
\ No newline at end of file
+    }
+
+def include_total_requested(default=True):
+    """Whether the caller wants a total count (``?include_total=false`` skips the COUNT)."""
+    value = request.args.get('include_total')
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no')
+
+def encode_cursor(values):
+    """Encode sort key values as an opaque URL-safe cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, columns, extra=0):
+    """Decode a cursor produced by ``encode_cursor`` for the given sort columns.
+
+    ``extra`` integer values carried after the sort key are returned as-is.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns) + extra:
+            raise ValueError
+        if not all(isinstance(value, int) for value in values[len(columns):]):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(columns, values)
+        ] + values[len(columns):]
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+class KeysetPage:
+    """One page of a keyset-paginated query."""
+    
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+def keyset_paginate(query, columns, cursor, per_page, include_total=False, entity=None, rank_by=None):
+    """Paginate by seeking past the last row of the previous page.
+
+    ``columns`` is the descending sort key and must end with a unique column.
+    Each page is an index range scan starting after the cursor position
+    rather than an OFFSET scan, so fetching a page does not get slower with
+    depth (the optional total is still a full count). ``entity`` picks the
+    model instance out of each row for multi-entity queries.
+
+    With ``rank_by`` (a prefix of ``columns``) items come back as
+    ``(item, rank)`` pairs numbered like ``RANK() OVER (ORDER BY rank_by
+    DESC)``. The cursor carries the last row's rank and position, so ranking
+    a page needs no extra queries. Raises ``ValueError`` for malformed cursors.
+    """
+    total = query.order_by(None).count() if include_total else None
+    
+    # Rank of the row before this page, rows before this page and that row's tie key
+    rank, position, previous = 0, 0, None
+    if cursor:
+        values = decode_cursor(cursor, columns, extra=2 if rank_by else 0)
+        if rank_by:
+            values, (rank, position) = values[:len(columns)], values[len(columns):]
+            previous = values[:len(rank_by)]
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    
+    rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+    items = rows[:per_page]
+    
+    if rank_by:
+        ranked = []
+        for offset, item in enumerate(items):
+            row = entity(item) if entity else item
+            key = [getattr(row, column.key) for column in rank_by]
+            if key != previous:
+                rank = position + offset + 1
+            previous = key
+            ranked.append((item, rank))
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        last = entity(items[-1]) if entity else items[-1]
+        values = [getattr(last, column.key) for column in columns]
+        if rank_by:
+            values += [rank, position + len(items)]
+        next_cursor = encode_cursor(values)
+    
+    return KeysetPage(ranked if rank_by else items, next_cursor, total)